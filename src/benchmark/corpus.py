@@ -0,0 +1,207 @@
+"""
+Generate synthetic original datasets, in the same forms as the Kaggle datasets, for benchmarks.
+
+Run it in the `src` directory:
+
+    python -m benchmark.corpus OUT_DIR [--rows N] [--seed N] [--density P]
+"""
+
+import argparse
+import csv
+import datetime as dt
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+
+from clean import PathTuple
+from config import Config
+
+
+# Sentences mentioning countries. Each placeholder is replaced by a country name.
+_MENTIONS: list[str] = [
+    "We are negotiating a great trade deal with {0}.",
+    "{0} has been taking advantage of us for many years!",
+    "I had a very good call with the leader of {0} today.",
+    "Our relationship with {0} and {1} has never been stronger.",
+    "{0}, {1} and {2} must pay their fair share.",
+    "The meeting between {0} and {1} went very well.",
+]
+
+# Sentences without countries.
+_FILLERS: list[str] = [
+    "Thank you to all of our great supporters.",
+    "The economy is doing better than ever before.",
+    "Fake news media is working overtime.",
+    "We will make our country great again!",
+    "Jobs, jobs, jobs.",
+    "Congress must act now.",
+    "It was an honor to be with so many wonderful people.",
+]
+
+# The row chunk size used when writing files, so the memory usage does not depend on the number of rows.
+_CHUNK_SIZE: int = 100_000
+
+
+class Corpus:
+    """
+    Generate tweets, presidential speeches and State of the Union Addresses with random country mentions.
+    Countries are drawn from the country list by a Zipf-like distribution, so a few countries are mentioned
+    much more than the others, and all their names, including synonyms, are used.
+    """
+    def __init__(self, countries_path: Path, config: Config | None = None, seed: int = 0,
+                 density: float = 0.3) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries_path: The path of the country list.
+        config: The date range and speakers of statements. About a tenth of statements are out of the range,
+            and some speeches belong to other presidents, so they are filtered out by the clean.
+        seed: The seed of the random generator.
+        density: The ratio of sentences mentioning countries.
+        """
+        assert 0 <= density <= 1
+        with countries_path.open(encoding="utf-8") as file:
+            countries = json.load(file)
+        # All names of a country, including synonyms, can be mentioned.
+        self._names: list[list[str]] = [[i["country"]] if type(i["country"]) is str else i["country"]
+                                        for i in countries]
+        self._config: Config = config if config is not None else Config()
+        self._rng: np.random.Generator = np.random.default_rng(seed)
+        # The popularity ranks of countries are shuffled, so the most mentioned country is not always the first one.
+        ranks = self._rng.permutation(len(self._names)) + 1.0
+        self._weights: np.ndarray = (1 / ranks) / (1 / ranks).sum()
+        self._density: float = density
+
+    def generate(self, out_dir: Path, rows: int) -> PathTuple:
+        """
+        Generate the three original datasets.
+
+        -- PARAMETERS --
+        out_dir: The directory of datasets.
+        rows: The total number of statements. Most of them are tweets.
+
+        -- RETURNS --
+        The paths of datasets.
+        """
+        assert rows >= 3
+        out_dir.mkdir(parents=True, exist_ok=True)
+        addresses = max(rows // 1000, 1)
+        speeches = max(rows // 100, 1)
+        tweets = rows - speeches - addresses
+
+        paths = PathTuple()
+        paths.trump_tweet = out_dir.joinpath("donald_trump_tweet.csv")
+        paths.president_speech = out_dir.joinpath("presidential_speech.csv")
+        paths.state_of_union_address = out_dir.joinpath("state_of_the_union_address.csv")
+        self._write(paths.trump_tweet, ["id", "link", "content", "date", "retweets", "favorites", "mentions",
+                                        "hashtags"], self._tweets(tweets))
+        self._write(paths.president_speech, ["Date", "President", "Party", "Speech Title", "Summary", "Transcript",
+                                             "URL"], self._speeches(speeches))
+        self._write(paths.state_of_union_address, ["President", "Year", "Title", "Text"],
+                    self._addresses(addresses))
+        return paths
+
+    @staticmethod
+    def _write(path: Path, header: list[str], rows: Iterator[list]) -> None:
+        with path.open("w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == _CHUNK_SIZE:
+                    writer.writerows(chunk)
+                    chunk.clear()
+            writer.writerows(chunk)
+
+    def _tweets(self, num: int) -> Iterator[list]:
+        for begin in range(0, num, _CHUNK_SIZE):
+            size = min(_CHUNK_SIZE, num - begin)
+            dates = self._dates(size)
+            seconds = self._rng.integers(0, 24 * 3600, size).tolist()
+            texts = self._texts(self._rng.integers(1, 4, size))
+            for i in range(size):
+                time = f"{seconds[i] // 3600:02d}:{seconds[i] // 60 % 60:02d}:{seconds[i] % 60:02d}"
+                yield [begin + i, "", texts[i], f"{dates[i]} {time}", 0, 0, "", ""]
+
+    def _speeches(self, num: int) -> Iterator[list]:
+        speakers = self._speakers()
+        for begin in range(0, num, _CHUNK_SIZE):
+            size = min(_CHUNK_SIZE, num - begin)
+            dates = self._dates(size)
+            who = self._rng.integers(len(speakers), size=size).tolist()
+            texts = self._texts(self._rng.integers(20, 60, size))
+            for i in range(size):
+                yield [dates[i], speakers[who[i]], "", "", "", texts[i], ""]
+
+    def _addresses(self, num: int) -> Iterator[list]:
+        speakers = self._speakers()
+        for begin in range(0, num, _CHUNK_SIZE):
+            size = min(_CHUNK_SIZE, num - begin)
+            dates = self._dates(size)
+            who = self._rng.integers(len(speakers), size=size).tolist()
+            texts = self._texts(self._rng.integers(100, 200, size))
+            for i in range(size):
+                yield [speakers[who[i]], dates[i][:4], "", texts[i]]
+
+    def _speakers(self) -> list[str]:
+        """
+        Get the speakers of speeches, including one who is not configured.
+        """
+        return self._config.speakers + ["George Washington"]
+
+    def _dates(self, num: int) -> list[str]:
+        """
+        Get random dates. About a tenth of them are before the date range.
+        """
+        begin = self._config.begin - dt.timedelta(days=max((self._config.end - self._config.begin).days // 9, 1))
+        days = self._rng.integers(0, (self._config.end - begin).days + 1, num)
+        return [(begin + dt.timedelta(days=i)).isoformat() for i in days.tolist()]
+
+    def _texts(self, lengths: np.ndarray) -> list[str]:
+        """
+        Get random texts. All random numbers are drawn at once for all sentences.
+
+        -- PARAMETERS --
+        lengths: The number of sentences in each text.
+        """
+        num = int(lengths.sum())
+        mentions = (self._rng.random(num) < self._density).tolist()
+        fillers = self._rng.integers(len(_FILLERS), size=num).tolist()
+        templates = self._rng.integers(len(_MENTIONS), size=num).tolist()
+        # Each sentence has at most three countries, and each country name is chosen among its synonyms.
+        countries = self._rng.choice(len(self._names), size=(num, 3), p=self._weights).tolist()
+        synonyms = self._rng.random((num, 3)).tolist()
+
+        sentences = []
+        for i in range(num):
+            if not mentions[i]:
+                sentences.append(_FILLERS[fillers[i]])
+                continue
+            names = [self._names[c][int(r * len(self._names[c]))] for c, r in zip(countries[i], synonyms[i])]
+            sentences.append(_MENTIONS[templates[i]].format(*names))
+
+        texts, begin = [], 0
+        for length in lengths.tolist():
+            texts.append(" ".join(sentences[begin:begin + length]))
+            begin += length
+        return texts
+
+
+def main() -> None:
+    src_dir = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Generate synthetic original datasets.")
+    parser.add_argument("out_dir", type=Path, help="The directory of datasets.")
+    parser.add_argument("--rows", type=int, default=10_000, help="The total number of statements.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random generator.")
+    parser.add_argument("--density", type=float, default=0.3, help="The ratio of sentences mentioning countries.")
+    args = parser.parse_args()
+
+    Corpus(src_dir.joinpath("countries.json"), seed=args.seed, density=args.density).generate(args.out_dir, args.rows)
+
+
+if __name__ == "__main__":
+    main()
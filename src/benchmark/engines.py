@@ -0,0 +1,102 @@
+"""
+Compare the speed of analyze engines and their agreement with the original noun-chunk engine.
+
+Run it in the `src` directory:
+
+    python -m benchmark.engines [--segment DIR] [--limit N] [--json]
+"""
+
+import argparse
+import collections as clc
+import itertools
+import json
+import time
+from pathlib import Path
+
+from country import Container, Matcher
+from counter import Director
+from engine import ENGINES, Engine, NounChunkEngine, create
+
+
+class Result:
+    """
+    The result of an engine.
+    """
+    def __init__(self, name: str, seconds: float, countries: list[clc.Counter]) -> None:
+        self.name: str = name
+        self.seconds: float = seconds
+        self.countries: list[clc.Counter] = countries
+
+    @property
+    def mentions(self) -> int:
+        return sum(sum(i.values()) for i in self.countries)
+
+    def agreement(self, baseline: "Result") -> dict[str, float]:
+        """
+        Compare countries found in each sentence cluster with a baseline.
+
+        -- RETURNS --
+        identical: The ratio of clusters in which the same countries are found.
+        precision: The ratio of mentions that are also found by the baseline.
+        recall: The ratio of the baseline's mentions that are also found.
+        """
+        identical = sum(1 for a, b in zip(self.countries, baseline.countries) if a == b)
+        common = sum(sum((a & b).values()) for a, b in zip(self.countries, baseline.countries))
+        return {
+            "identical": identical / max(len(self.countries), 1),
+            "precision": common / max(self.mentions, 1),
+            "recall": common / max(baseline.mentions, 1),
+        }
+
+
+def run(name: str, engine: Engine, clusters: list[tuple[str, int]], countries: Container) -> Result:
+    """
+    Extract countries from sentence clusters by an engine.
+    """
+    begin = time.perf_counter()
+    nouns = [i for i, _ in engine.extract(clusters)]
+    seconds = time.perf_counter() - begin
+    found = [clc.Counter(name for name in map(countries.main_name, i) if name) for i in nouns]
+    return Result(name, seconds, found)
+
+
+def main() -> None:
+    src_dir = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Benchmark analyze engines.")
+    parser.add_argument("--segment", type=Path, default=src_dir.parent.joinpath("data", "segment"),
+                        help="The directory of annual files.")
+    parser.add_argument("--limit", type=int, default=None, help="The maximum number of sentence clusters.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    countries = Container(src_dir.joinpath("countries.json"))
+    matcher = Matcher(countries)
+    clusters = list(itertools.islice(Director(args.segment, []).clusters(), args.limit))
+
+    # The baseline is the original engine, which matches whole noun chunks exactly.
+    baseline = run("baseline", NounChunkEngine(), clusters, countries)
+    results = [run(name, create(name, matcher), clusters, countries) for name in ENGINES]
+
+    report = []
+    for result in [baseline] + results:
+        report.append({
+            "engine": result.name,
+            "seconds": result.seconds,
+            "clusters_per_second": len(clusters) / result.seconds if result.seconds > 0 else None,
+            "mentions": result.mentions,
+            **result.agreement(baseline),
+        })
+
+    if args.json:
+        print(json.dumps({"clusters": len(clusters), "engines": report}, indent=4))
+        return
+    print(f"{len(clusters)} sentence clusters")
+    print(f"{'engine':<12}{'seconds':>10}{'clusters/s':>12}{'mentions':>10}"
+          f"{'identical':>11}{'precision':>11}{'recall':>9}")
+    for i in report:
+        print(f"{i['engine']:<12}{i['seconds']:>10.2f}{i['clusters_per_second'] or 0:>12.0f}{i['mentions']:>10}"
+              f"{i['identical']:>11.3f}{i['precision']:>11.3f}{i['recall']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
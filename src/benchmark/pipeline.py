@@ -0,0 +1,229 @@
+"""
+Time and profile the memory usage of every stage of the pipeline on a synthetic corpus.
+
+Run it in the `src` directory:
+
+    python -m benchmark.pipeline [--rows N] [--seed N] [--work DIR] [--engine NAME] [--processes N]
+                                 [--compact] [--array] [--memory] [--json]
+
+Counts are written in the formats configured in `main.py` unless they are given.
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+from pathlib import Path
+
+from benchmark.corpus import Corpus
+from clean import Standard, Segment
+from config import Config
+from country import Container, Matcher
+from counter import Director, ParallelDirector, NormalCounter, ArrayNormalCounter, DiplomacyCounter, write_counts
+from engine import ENGINES, create
+from metrics import max_rss
+from ranking import Ranking
+from visualize.loader import PathTuple, NormalLoader, DiplomacyLoader, LongDiplomacyLoader, RankingLoader
+from visualize.graph import BarChart, Sankey, FlowMap
+import main as pipeline
+
+
+class Measurement:
+    """
+    The cost of a stage.
+    """
+    def __init__(self, stage: str, seconds: float, items: int | None, peak_memory: int | None,
+                 max_rss: int | None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        stage: The name of a stage.
+        seconds: The elapsed time.
+        items: The number of items handled, such as rows or bytes. `None` means it is unknown.
+        peak_memory: The peak size of memory allocated by Python during the stage, in bytes.
+            `None` means memory is not traced.
+        max_rss: The maximum resident set size of the process and its finished children so far, in bytes.
+        """
+        self.stage: str = stage
+        self.seconds: float = seconds
+        self.items: int | None = items
+        self.peak_memory: int | None = peak_memory
+        self.max_rss: int | None = max_rss
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "seconds": self.seconds,
+            "items": self.items,
+            "items_per_second": self.items / self.seconds if self.items is not None and self.seconds > 0 else None,
+            "peak_memory": self.peak_memory,
+            "max_rss": self.max_rss,
+        }
+
+
+class Profiler:
+    """
+    Measure stages one after another.
+    """
+    def __init__(self, memory: bool = False) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        memory: Whether to trace memory allocations by `tracemalloc`, which slows down stages.
+        """
+        self._memory: bool = memory
+        self.measurements: list[Measurement] = []
+
+    @contextlib.contextmanager
+    def measure(self, stage: str, items: int | None = None) -> Iterator[dict]:
+        """
+        Measure a stage in a `with` block.
+
+        -- PARAMETERS --
+        stage: The name of the stage.
+        items: The number of items handled. It can also be set by the `items` key of the yielded dictionary.
+        """
+        info = {"items": items}
+        if self._memory:
+            tracemalloc.start()
+        begin = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - begin
+            peak = None
+            if self._memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.measurements.append(Measurement(stage, seconds, info["items"], peak, max_rss()))
+
+
+def run(work_dir: Path, rows: int, seed: int, density: float, engine: str, processes: int,
+        memory: bool, compact: bool = False, array: bool = False) -> list[Measurement]:
+    """
+    Generate a corpus and run every stage on it.
+    Counts are written by the same writers as `main.py`, as JSON Lines if `compact` is true
+    and normal counts as a NumPy archive if `array` is true.
+    """
+    src_dir = Path(__file__).parent.parent
+    config = Config()
+    countries = Container(src_dir.joinpath("countries.json"))
+    profiler = Profiler(memory)
+
+    with profiler.measure("generate", rows):
+        paths = Corpus(src_dir.joinpath("countries.json"), config, seed, density).generate(
+            work_dir.joinpath("origin"), rows)
+
+    with profiler.measure("clean.standard") as info:
+        data = Standard(paths, work_dir.joinpath("clean"), arrow=True, config=config).handle()
+        info["items"] = len(data.trump_tweet) + len(data.president_speech) + len(data.state_of_union_address)
+
+    with profiler.measure("clean.segment") as info:
+        Segment(work_dir.joinpath("segment"), config).handle_dataframe(data)
+        info["items"] = sum(i.stat().st_size for i in work_dir.joinpath("segment").glob("*.txt"))
+    del data
+
+    normal = ArrayNormalCounter(countries, config.periods()) if array else NormalCounter(countries, config.periods())
+    diplomacy = DiplomacyCounter(countries, normal, config.periods())
+    with profiler.measure("analyze") as info:
+        nlp = create(engine, Matcher(countries))
+        if processes > 1:
+            ParallelDirector(work_dir.joinpath("segment"), [diplomacy], nlp, processes=processes).handle()
+        else:
+            Director(work_dir.joinpath("segment"), [diplomacy], nlp).handle()
+        info["items"] = sum(i.stat().st_size for i in work_dir.joinpath("segment").glob("*.txt"))
+
+    count_dir = work_dir.joinpath("count")
+    with profiler.measure("analyze.write"):
+        if array:
+            count_dir.joinpath("normal").mkdir(parents=True, exist_ok=True)
+            normal.save(count_dir.joinpath("normal", pipeline.NORMAL_ARRAY_FILE))
+        else:
+            write_counts(normal, count_dir.joinpath("normal"), compact, pipeline.JSON_INDENT)
+        write_counts(diplomacy, count_dir.joinpath("diplomacy"), compact, pipeline.JSON_INDENT)
+        ranking = Ranking(excluded=[countries.main_name("United States")])
+        ranking.handle(normal, diplomacy)
+        ranking.save(count_dir.joinpath("ranking.json"))
+
+    loaders = {}
+    for name, loader, kind in [("normal", NormalLoader(), "normal"), ("diplomacy", DiplomacyLoader(), "diplomacy"),
+                               ("long-diplomacy", LongDiplomacyLoader(), "diplomacy")]:
+        suffix = ".jsonl" if compact else ".json"
+        paths = PathTuple()
+        paths.total = count_dir.joinpath(kind, "total_count" + suffix)
+        paths.annual = count_dir.joinpath(kind, "annual_count" + suffix)
+        with profiler.measure(f"load.{name}"):
+            if array and kind == "normal":
+                loader.load_array(count_dir.joinpath("normal", pipeline.NORMAL_ARRAY_FILE))
+            elif compact:
+                loader.load_compact(paths)
+            else:
+                loader.load(paths)
+        loaders[name] = loader
+    with profiler.measure("load.ranking"):
+        loaders["ranking"] = RankingLoader()
+        loaders["ranking"].load(count_dir.joinpath("ranking.json"))
+
+    usa = countries.main_name("United States")
+    for name, chart in [("bar-chart", BarChart(usa, loaders["normal"])),
+                        ("sankey-diagram", Sankey(usa, loaders["normal"], loaders["long-diplomacy"])),
+                        ("flow-map", FlowMap(usa, countries, loaders["normal"]))]:
+        with profiler.measure(f"render.{name}"):
+            chart.render(work_dir.joinpath("visualize", f"{name}.html"))
+    return profiler.measurements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the pipeline on a synthetic corpus.")
+    parser.add_argument("--rows", type=int, default=10_000, help="The total number of generated statements.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random generator.")
+    parser.add_argument("--density", type=float, default=0.3, help="The ratio of sentences mentioning countries.")
+    parser.add_argument("--work", type=Path, default=None,
+                        help="The directory of generated files. The default is a temporary directory.")
+    parser.add_argument("--engine", choices=ENGINES, default="noun-chunk", help="The engine extracting nouns.")
+    parser.add_argument("--processes", type=int, default=1, help="The number of analysis processes.")
+    parser.add_argument("--compact", action=argparse.BooleanOptionalAction, default=pipeline.COMPACT_OUTPUT,
+                        help="Whether to write counts as JSON Lines. The default is `COMPACT_OUTPUT` of `main.py`.")
+    parser.add_argument("--array", action=argparse.BooleanOptionalAction, default=pipeline.NORMAL_ARRAY,
+                        help="Whether to write normal counts as a NumPy archive. "
+                             "The default is `NORMAL_ARRAY` of `main.py`.")
+    parser.add_argument("--memory", action="store_true", help="Trace memory allocations, which is slower.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        work_dir = args.work if args.work is not None else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        measurements = run(work_dir, args.rows, args.seed, args.density, args.engine, args.processes, args.memory,
+                           args.compact, args.array)
+
+    if args.json:
+        print(json.dumps({
+            "rows": args.rows,
+            "seed": args.seed,
+            "density": args.density,
+            "engine": args.engine,
+            "processes": args.processes,
+            "compact": args.compact,
+            "array": args.array,
+            "python": platform.python_version(),
+            "stages": [i.to_dict() for i in measurements],
+        }, indent=4))
+        return
+    print(f"{args.rows} rows")
+    print(f"{'stage':<24}{'seconds':>10}{'items/s':>14}{'peak MB':>10}{'max RSS MB':>12}")
+    for i in measurements:
+        res = i.to_dict()
+        peak = f"{i.peak_memory / 2 ** 20:.1f}" if i.peak_memory is not None else "-"
+        rss = f"{i.max_rss / 2 ** 20:.1f}" if i.max_rss is not None else "-"
+        speed = f"{res['items_per_second']:.0f}" if res["items_per_second"] is not None else "-"
+        print(f"{i.stage:<24}{i.seconds:>10.3f}{speed:>14}{peak:>10}{rss:>12}")
+
+
+if __name__ == "__main__":
+    main()
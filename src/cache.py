@@ -0,0 +1,169 @@
+import hashlib
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+from collections.abc import Iterable, Iterator
+
+
+class Entry:
+    """
+    The nouns extracted from a shard, along with the size of the shard.
+    """
+    def __init__(self, nouns: Iterable[list[str]], clusters: int, sentences: int = 0, tokens: int = 0) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        nouns: The nouns in each sentence cluster. They are read from the database batch by batch.
+        clusters: The number of sentence clusters.
+        sentences: The number of sentences.
+        tokens: The number of whitespace-separated tokens.
+        """
+        self.nouns: Iterable[list[str]] = nouns
+        self.clusters: int = clusters
+        self.sentences: int = sentences
+        self.tokens: int = tokens
+
+
+class EntryWriter:
+    """
+    Store the nouns extracted from a shard batch by batch, so they are never held in memory at once.
+    A shard is only hit after the writer has been closed, so a shard extracted partially is never used.
+    """
+    def __init__(self, cache: "Cache", key: str, batch_size: int = 1024) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        cache: A cache.
+        key: The key of a shard.
+        batch_size: The number of sentence clusters stored in a database row.
+        """
+        assert batch_size > 0
+        self._cache: Cache = cache
+        self._key: str = key
+        self._batch_size: int = batch_size
+        self._batch: list[list[str]] = []
+        self._batches: int = 0
+        self.clusters: int = 0
+        self.sentences: int = 0
+        self.tokens: int = 0
+
+    def append(self, nouns: list[str]) -> None:
+        """
+        Add the nouns in the next sentence cluster.
+        """
+        self._batch.append(nouns)
+        self.clusters += 1
+        if len(self._batch) == self._batch_size:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        Store the remaining nouns along with the size of the shard.
+        """
+        if len(self._batch) > 0:
+            self._flush()
+        self._cache._put_entry(self._key, self._batches, self.clusters, self.sentences, self.tokens)
+
+    def _flush(self) -> None:
+        self._cache._put_batch(self._key, self._batches, self._batch)
+        self._batch = []
+        self._batches += 1
+
+
+class Cache:
+    """
+    Store the nouns extracted from shards in an SQLite database.
+    Each record is addressed by the content of a shard and the version of the engine, so changed shards are never hit.
+    """
+    # The version of records, which is part of their keys. Records in older formats are never hit.
+    _FORMAT: int = 2
+
+    def __init__(self, path: Path) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        path: The path of a database file. It will be created if it does not exist.
+        """
+        self._path: Path = path
+        self._conn: sqlite3.Connection = None
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def key(content: Iterable[bytes], version: str) -> str:
+        """
+        Get the key of a shard.
+
+        -- PARAMETERS --
+        content: The content of a shard in blocks.
+        version: The version of everything the nouns depend on, such as the engine and the country list.
+        """
+        digest = hashlib.sha256(f"{Cache._FORMAT}/{version}".encode("utf-8"))
+        digest.update(b"\0")
+        for data in content:
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Entry | None:
+        """
+        Get the nouns in each sentence cluster of a shard, along with its size.
+        If the shard is not cached, return `None`.
+        """
+        row = self._connect().execute("SELECT batches, clusters, sentences, tokens FROM entry WHERE key = ?",
+                                      (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        batches, clusters, sentences, tokens = row
+        return Entry(self._nouns(key, batches), clusters, sentences, tokens)
+
+    def writer(self, key: str) -> EntryWriter:
+        """
+        Get a writer storing the nouns extracted from a shard.
+        """
+        return EntryWriter(self, key)
+
+    def _nouns(self, key: str, batches: int) -> Iterator[list[str]]:
+        """
+        Read the nouns of a shard batch by batch.
+        """
+        for i in range(batches):
+            row = self._connect().execute("SELECT nouns FROM batch WHERE key = ? AND number = ?", (key, i)).fetchone()
+            yield from json.loads(zlib.decompress(row[0]))
+
+    def _put_batch(self, key: str, number: int, nouns: list[list[str]]) -> None:
+        data = zlib.compress(json.dumps(nouns, separators=(",", ":")).encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO batch (key, number, nouns) VALUES (?, ?, ?)", (key, number, data))
+
+    def _put_entry(self, key: str, batches: int, clusters: int, sentences: int, tokens: int) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entry (key, batches, clusters, sentences, tokens) "
+                         "VALUES (?, ?, ?, ?, ?)", (key, batches, clusters, sentences, tokens))
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open the database lazily, so a cache can be sent to other processes before being used.
+        """
+        if self._conn is None:
+            if not self._path.parent.exists():
+                self._path.parent.mkdir(parents=True)
+            self._conn = sqlite3.connect(self._path, timeout=60)
+            with self._conn:
+                # Shards used to be stored in a single row, which is never hit now.
+                self._conn.execute("DROP TABLE IF EXISTS shard")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS entry (key TEXT PRIMARY KEY, batches INTEGER NOT NULL, "
+                                   "clusters INTEGER NOT NULL, sentences INTEGER NOT NULL, tokens INTEGER NOT NULL)")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS batch (key TEXT NOT NULL, number INTEGER NOT NULL, "
+                                   "nouns BLOB NOT NULL, PRIMARY KEY (key, number))")
+        return self._conn
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
@@ -0,0 +1,90 @@
+import os
+import pickle
+import time
+from pathlib import Path
+from collections.abc import Sequence
+
+
+class State:
+    """
+    The progress of an analysis.
+    """
+    def __init__(self, counters: Sequence, done: set[str], current: str | None = None, offset: int = 0,
+                 director: str | None = None, shard_size: int | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        counters: The counters containing all counts so far.
+        done: The keys of the shards that have been counted.
+        current: The key of the shard being counted.
+        offset: The number of sentence clusters in the current shard that have been counted.
+        director: The name of the director class counting shards, such as "Director" or "ParallelDirector".
+        shard_size: The maximum number of bytes in a shard. `None` means a whole annual file.
+        """
+        self.counters: Sequence = counters
+        self.done: set[str] = done
+        self.current: str | None = current
+        self.offset: int = offset
+        self.director: str | None = director
+        self.shard_size: int | None = shard_size
+
+
+class Checkpoint:
+    """
+    Periodically save the counters and the progress of an analysis to a file, so it can be resumed after a crash.
+    """
+    def __init__(self, path: Path, interval: float = 60, resume: bool = False) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        path: The path of the checkpoint file.
+        interval: The minimum number of seconds between two saves.
+        resume: Whether to continue from the existing checkpoint. Otherwise it is ignored and overwritten.
+        """
+        assert interval >= 0
+        self._path: Path = path
+        self._interval: float = interval
+        self._resume: bool = resume
+        self._last: float = time.monotonic()
+
+    @staticmethod
+    def key(path: Path, begin: int, end: int | None) -> str:
+        """
+        Get the key of a shard, which changes if its file is modified.
+        """
+        stat = path.stat()
+        return f"{path.name}:{begin}:{end}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def load(self) -> State | None:
+        """
+        Load the saved progress if resuming is enabled and there is a checkpoint.
+        """
+        if not self._resume or not self._path.exists():
+            return None
+        with self._path.open("rb") as file:
+            return pickle.load(file)
+
+    def due(self) -> bool:
+        """
+        Check whether the interval has passed since the last save.
+        """
+        return time.monotonic() - self._last >= self._interval
+
+    def save(self, state: State) -> None:
+        """
+        Save the progress. The file is replaced at once, so a crash during saving never corrupts the checkpoint.
+        """
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._path.with_name(self._path.name + ".tmp")
+        with temp.open("wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self._path)
+        self._last = time.monotonic()
+
+    def remove(self) -> None:
+        """
+        Remove the checkpoint after the analysis has finished and its counts have been written.
+        """
+        self._path.unlink(missing_ok=True)
@@ -1,10 +1,19 @@
 from typing import TextIO
+import datetime as dt
+import logging
+from collections.abc import Iterable, Iterator, Sequence
 from pathlib import Path
 import os
 
 import pandas as pd
 
-from presidential_term import BEGIN_YEAR, END_YEAR
+from config import Config
+from metrics import Metrics
+from store import Store
+
+
+# The names of datasets, in the order of being segmented.
+SOURCES: list[str] = ["trump_tweet", "president_speech", "state_of_union_address"]
 
 
 class PathTuple:
@@ -27,29 +36,107 @@ class DataFrameTuple:
         self.state_of_union_address: pd.DataFrame = None
 
 
+def read_csv(path: Path, columns: list[str], among: dict[str, Sequence[str]] | None = None,
+             between: dict[str, tuple[str, str]] | None = None, arrow: bool = False) -> pd.DataFrame:
+    """
+    Read some columns of a CSV file as strings and only keep the rows satisfying all filters.
+
+    -- PARAMETERS --
+    path: The path of a CSV file.
+    columns: The columns to read. The columns used by filters must be included.
+    among: Columns and the values they must be one of.
+    between: Columns and the ranges their values must be in. A range includes its lower bound but not its upper bound.
+        Values are compared as strings.
+    arrow: Whether to read the file by `pyarrow`, which applies filters while scanning the file,
+        so the rows filtered out are never converted to pandas.
+    """
+    return next(read_csv_chunks(path, columns, among, between, arrow=arrow))
+
+
+def read_csv_chunks(path: Path, columns: list[str], among: dict[str, Sequence[str]] | None = None,
+                    between: dict[str, tuple[str, str]] | None = None, chunk_size: int | None = None,
+                    arrow: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV file like `read_csv`, but in chunks.
+
+    -- PARAMETERS --
+    chunk_size: The maximum number of rows read at once. `None` means the whole file is a chunk.
+    """
+    assert chunk_size is None or chunk_size > 0
+    among = among or {}
+    between = between or {}
+    if arrow:
+        import pyarrow as pa
+        import pyarrow.csv as csv
+        import pyarrow.dataset as ds
+
+        file_format = ds.CsvFileFormat(parse_options=csv.ParseOptions(newlines_in_values=True),
+                                       convert_options=csv.ConvertOptions(
+                                           column_types={column: pa.string() for column in columns}))
+        condition = None
+        for column, values in among.items():
+            condition = _and(condition, ds.field(column).isin(list(values)))
+        for column, (lower, upper) in between.items():
+            condition = _and(condition, (ds.field(column) >= lower) & (ds.field(column) < upper))
+        dataset = ds.dataset(path, format=file_format)
+        types = {pa.string(): pd.StringDtype("pyarrow")}.get
+        if chunk_size is None:
+            yield dataset.to_table(columns=columns, filter=condition).to_pandas(types_mapper=types)
+        else:
+            for batch in dataset.to_batches(columns=columns, filter=condition, batch_size=chunk_size):
+                yield batch.to_pandas(types_mapper=types)
+        return
+
+    chunks = pd.read_csv(path, usecols=columns, dtype="string", chunksize=chunk_size)
+    for data in [chunks] if chunk_size is None else chunks:
+        data = data[columns]
+        mask = pd.Series(True, index=data.index)
+        for column, values in among.items():
+            mask &= data[column].isin(list(values))
+        for column, (lower, upper) in between.items():
+            mask &= (data[column] >= lower) & (data[column] < upper)
+        yield data[mask.fillna(False)].reset_index(drop=True)
+
+
+def _and(lhs, rhs):
+    """
+    Combine two `pyarrow` filters. The left one might be `None`.
+    """
+    return rhs if lhs is None else lhs & rhs
+
+
 def sort_date(data: pd.DataFrame) -> None:
     """
     Sort a dataframe by its time index.
     """
     data["date"] = pd.to_datetime(data["date"])
     data.set_index("date", inplace=True)
-    data.sort_index(inplace=True)
+    data.sort_index(inplace=True, kind="stable")
 
 
 class Standard:
     """
-    Unify the form of datasets, only remaining the "date" and "content" columns.
+    Unify the form of datasets, only remaining the "date", "content" and "speaker" columns.
     """
-    def __init__(self, in_paths: PathTuple, out_dir: Path) -> None:
+    def __init__(self, in_paths: PathTuple, out_dir: Path, arrow: bool = False, store: Store | None = None,
+                 config: Config | None = None, metrics: Metrics | None = None) -> None:
         """
         The constructor.
 
         -- PARAMETERS --
         in_paths: The paths of original datasets.
         out_dir: A directory used to store standard datasets.
+        arrow: Whether to read original datasets by `pyarrow`.
+        store: A Parquet store. If it is provided, standard datasets are also written to it.
+        config: The date range and speakers to remain. The default is Donald Trump's first presidential term.
+        metrics: A collection of the numbers of rows remained and dropped.
         """
+        self._metrics: Metrics = metrics if metrics is not None else Metrics()
+        self._config: Config = config if config is not None else Config()
         self._in_paths: PathTuple = in_paths
         self._out_dir: Path = out_dir
+        self._arrow: bool = arrow
+        self._store: Store | None = store
         self._data: DataFrameTuple = DataFrameTuple()
 
     def handle(self) -> DataFrameTuple:
@@ -59,49 +146,92 @@ class Standard:
         if not self._out_dir.exists():
             self._out_dir.mkdir(parents=True)
 
-        self._handle_trump_tweet()
-        self._handle_president_speech()
-        self._handle_state_of_union_address()
+        [self._data.trump_tweet] = self._handle_trump_tweet()
+        [self._data.president_speech] = self._handle_president_speech()
+        [self._data.state_of_union_address] = self._handle_state_of_union_address()
         return self._data
 
-    def _handle_trump_tweet(self) -> None:
-        data = pd.read_csv(self._in_paths.trump_tweet)
-        res = data.loc[:, ["date", "content"]]
-        res["date"] = res["date"].str[:10]
-
-        res = self._remove_irrelevance(res)
-        self._data.trump_tweet = res
-        self._write_csv_file(res, self._out_dir, Path(self._in_paths.trump_tweet).name)
-
-    def _handle_president_speech(self) -> None:
-        data = pd.read_csv(self._in_paths.president_speech)
-        res = data.loc[data["President"] == "Donald Trump", ["Date", "Transcript"]]
-        res.rename(columns={"Date": "date", "Transcript": "content"}, inplace=True)
+    def stream(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Handle each dataset chunk by chunk, so the memory usage does not depend on the size of datasets.
+        Standard datasets are written by appending chunks, and each chunk is only sorted by itself.
 
-        res = self._remove_irrelevance(res)
-        self._data.president_speech = res
-        self._write_csv_file(res, self._out_dir, Path(self._in_paths.president_speech).name)
+        -- PARAMETERS --
+        chunk_size: The maximum number of rows read at once.
 
-    def _handle_state_of_union_address(self) -> None:
-        data = pd.read_csv(self._in_paths.state_of_union_address)
-        res = data.loc[data["President"] == "Donald Trump", ["Year", "Text"]]
-        res.rename(columns={"Year": "date", "Text": "content"}, inplace=True)
-        res["date"] = pd.to_datetime(res["date"], format="%Y").dt.strftime("%Y-01-01")
+        -- RETURNS --
+        Standard chunks of all datasets.
+        """
+        if not self._out_dir.exists():
+            self._out_dir.mkdir(parents=True)
 
-        res = self._remove_irrelevance(res)
-        self._data.state_of_union_address = res
-        self._write_csv_file(res, self._out_dir, Path(self._in_paths.state_of_union_address).name)
+        yield from self._handle_trump_tweet(chunk_size)
+        yield from self._handle_president_speech(chunk_size)
+        yield from self._handle_state_of_union_address(chunk_size)
+
+    def _handle_trump_tweet(self, chunk_size: int | None = None) -> Iterator[pd.DataFrame]:
+        if self._config.tweet_speaker in self._config.speakers:
+            dates = self._dates()
+        else:
+            # No string is in an empty range, so no tweet is loaded.
+            dates = ("", "")
+        chunks = read_csv_chunks(self._in_paths.trump_tweet, ["date", "content"], between={"date": dates},
+                                 chunk_size=chunk_size, arrow=self._arrow)
+        for i, res in enumerate(chunks):
+            res["date"] = res["date"].str[:10]
+            res["speaker"] = self._config.tweet_speaker
+
+            res = self._remove_irrelevance(res)
+            self._write_csv_file(res, self._out_dir, Path(self._in_paths.trump_tweet).name, append=i > 0)
+            self._write_store(res, "trump_tweet", append=i > 0)
+            yield res
+
+    def _handle_president_speech(self, chunk_size: int | None = None) -> Iterator[pd.DataFrame]:
+        chunks = read_csv_chunks(self._in_paths.president_speech, ["President", "Date", "Transcript"],
+                                 among={"President": self._config.speakers}, chunk_size=chunk_size, arrow=self._arrow)
+        for i, data in enumerate(chunks):
+            res = data.loc[:, ["Date", "Transcript", "President"]]
+            res.rename(columns={"Date": "date", "Transcript": "content", "President": "speaker"}, inplace=True)
+
+            res = self._remove_irrelevance(res)
+            self._write_csv_file(res, self._out_dir, Path(self._in_paths.president_speech).name, append=i > 0)
+            self._write_store(res, "president_speech", append=i > 0)
+            yield res
+
+    def _handle_state_of_union_address(self, chunk_size: int | None = None) -> Iterator[pd.DataFrame]:
+        chunks = read_csv_chunks(self._in_paths.state_of_union_address, ["President", "Year", "Text"],
+                                 among={"President": self._config.speakers},
+                                 between={"Year": (f"{self._config.begin.year}", f"{self._config.end.year + 1}")},
+                                 chunk_size=chunk_size, arrow=self._arrow)
+        for i, data in enumerate(chunks):
+            res = data.loc[:, ["Year", "Text", "President"]]
+            res.rename(columns={"Year": "date", "Text": "content", "President": "speaker"}, inplace=True)
+            res["date"] = pd.to_datetime(res["date"], format="%Y").dt.strftime("%Y-01-01")
+
+            res = self._remove_irrelevance(res)
+            self._write_csv_file(res, self._out_dir, Path(self._in_paths.state_of_union_address).name,
+                                 append=i > 0)
+            self._write_store(res, "state_of_union_address", append=i > 0)
+            yield res
+
+    def _dates(self) -> tuple[str, str]:
+        """
+        Get the date range as strings. The range includes the first date but not the date after the last one.
+        """
+        return self._config.begin.isoformat(), (self._config.end + dt.timedelta(days=1)).isoformat()
 
-    @staticmethod
-    def _remove_irrelevance(data: pd.DataFrame) -> pd.DataFrame:
+    def _remove_irrelevance(self, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Delete the contents that don't belong to Donald Trump's first presidential term.
+        Delete the contents that don't belong to the date range.
         """
         sort_date(data)
-        return data[f"{BEGIN_YEAR}":f"{END_YEAR}"]
+        res = data[self._config.begin.isoformat():self._config.end.isoformat()]
+        self._metrics.count("clean.rows", len(res))
+        self._metrics.count("clean.dropped_rows", len(data) - len(res))
+        return res
 
     @staticmethod
-    def _write_csv_file(data: pd.DataFrame, dir: Path, name: str) -> None:
+    def _write_csv_file(data: pd.DataFrame, dir: Path, name: str, append: bool = False) -> None:
         """
         Write a dataframe to a CSV file.
 
@@ -109,37 +239,70 @@ class Standard:
         data: A dataframe.
         dir: A directory to store the file.
         name: The name of the file.
+        append: Whether to append the dataframe to the file without a header.
         """
-        data.to_csv(dir.joinpath(name), index=True)
+        data.to_csv(dir.joinpath(name), index=True, mode="a" if append else "w", header=not append)
+
+    def _write_store(self, data: pd.DataFrame, source: str, append: bool = False) -> None:
+        """
+        Write a dataframe to the Parquet store if there is one.
+        """
+        if self._store is not None:
+            self._store.write(source, data, append)
 
 
 class Segment:
     """
-    Separate datasets into different annual files.
+    Separate datasets into different annual files, or files of other periods.
+    The period files of a previous run are removed first, so periods out of the current range are never counted.
     """
-    def __init__(self, out_dir: Path) -> None:
+    _BUFFER_SIZE: int = 1024 * 1024
+
+    # The names of period files, which are the same as the ones read by `counter.Director`.
+    _PATTERN: str = "[0-9][0-9][0-9][0-9]*.txt"
+
+    def __init__(self, out_dir: Path, config: Config | None = None, metrics: Metrics | None = None) -> None:
         """
         The constructor.
 
         -- PARAMETERS --
         out_dir: An output directory used to store annual files.
+        config: The period granularity and speakers. Each speaker's files are stored in `Config.speaker_dir`.
+        metrics: A collection of the numbers of rows written and dropped.
         """
+        self._metrics: Metrics = metrics if metrics is not None else Metrics()
+        self._config: Config = config if config is not None else Config()
         self._data: DataFrameTuple = None
-        self._annual_files: dict[int, TextIO] = {}
+        self._annual_files: dict[tuple[str, str], TextIO] = {}
         self._out_dir: Path = out_dir
         if not self._out_dir.exists():
             self._out_dir.mkdir(parents=True)
 
-    def handle_csv(self, paths: PathTuple) -> None:
+    def handle_csv(self, paths: PathTuple, chunk_size: int | None = None) -> None:
         """
         Handle data from CSV files.
+
+        -- PARAMETERS --
+        paths: The paths of standard datasets.
+        chunk_size: The maximum number of rows read at once. `None` means a whole file is read at once.
+            If files are read in chunks, each chunk is only sorted by itself.
         """
+        if chunk_size is not None:
+            def chunks() -> Iterator[pd.DataFrame]:
+                for path in [paths.trump_tweet, paths.president_speech, paths.state_of_union_address]:
+                    for data in read_csv_chunks(path, ["date", "content", "speaker"], chunk_size=chunk_size):
+                        sort_date(data)
+                        yield data
+
+            self.handle_chunks(chunks())
+            return
+
         data = DataFrameTuple()
-        data.trump_tweet = pd.read_csv(paths.trump_tweet)
+        data.trump_tweet = read_csv(paths.trump_tweet, ["date", "content", "speaker"])
         sort_date(data.trump_tweet)
-        data.president_speech = pd.read_csv(paths.president_speech)
+        data.president_speech = read_csv(paths.president_speech, ["date", "content", "speaker"])
         sort_date(data.president_speech)
-        data.state_of_union_address = pd.read_csv(paths.state_of_union_address)
+        data.state_of_union_address = read_csv(paths.state_of_union_address, ["date", "content", "speaker"])
         sort_date(data.state_of_union_address)
         self.handle_dataframe(data)
 
@@ -147,12 +310,36 @@ class Segment:
         """
         Handle data from dataframes.
         """
+        self._remove_files()
         self._data = data
         self._handle_trump_tweet()
         self._handle_president_speech()
         self._handle_state_of_union_address()
         self._close_files()
 
+    def handle_store(self, store: Store, years: Sequence[int] | None = None) -> None:
+        """
+        Handle data from a Parquet store. Only one partition is loaded at a time.
+
+        -- PARAMETERS --
+        store: A Parquet store written by `Standard`.
+        years: The years to handle. `None` means all years in the store. Only the files of these years are replaced.
+        """
+        self._remove_files(years)
+        for year in store.years() if years is None else years:
+            for source in SOURCES:
+                self._separate(store.read([source], [year]))
+        self._close_files()
+
+    def handle_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """
+        Handle data from dataframe chunks, such as the ones returned by `Standard.stream`.
+        """
+        self._remove_files()
+        for data in chunks:
+            self._separate(data)
+        self._close_files()
+
     def _handle_trump_tweet(self) -> None:
         self._separate(self._data.trump_tweet)
 
@@ -164,21 +351,43 @@ class Segment:
 
     def _separate(self, data: pd.DataFrame) -> None:
         """
-        Separate a dataframe into different annual files.
+        Separate a dataframe into different files by speaker and period.
+        The contents of a file are joined and written at once.
         """
-        for row in data.itertuples():
-            try:
-                self._get_file(row.Index.year).write(row.content + os.linesep)
-            except BaseException as err:
-                print(err)
-
-    def _get_file(self, year: int) -> TextIO:
+        periods = data.index.strftime(self._config.format)
+        for (speaker, period), contents in data["content"].groupby([data["speaker"], periods], sort=False):
+            empty = int(contents.isna().sum())
+            if empty > 0:
+                logging.getLogger(__name__).warning(f"{empty} empty contents of {speaker} in {period} are skipped.")
+                self._metrics.count("segment.dropped_rows", empty)
+            contents = contents.dropna()
+            self._metrics.count("segment.rows", len(contents))
+            if len(contents) > 0:
+                self._get_file(speaker, period).write(os.linesep.join(contents) + os.linesep)
+
+    def _get_file(self, speaker: str, period: str) -> TextIO:
+        """
+        Get the file corresponding to a specific speaker and period, such as "2017.txt".
         """
-        Get the annual file corresponding to a specific year.
+        if (speaker, period) not in self._annual_files:
+            dir = self._config.speaker_dir(self._out_dir, speaker)
+            if not dir.exists():
+                dir.mkdir(parents=True)
+            self._annual_files[(speaker, period)] = dir.joinpath(f"{period}.txt").open(
+                "w", encoding="utf-8", buffering=self._BUFFER_SIZE)
+        return self._annual_files[(speaker, period)]
+
+    def _remove_files(self, years: Sequence[int] | None = None) -> None:
+        """
+        Remove the period files of all speakers written before.
+
+        -- PARAMETERS --
+        years: The years whose files are removed. `None` means all years.
         """
-        if year not in self._annual_files:
-            self._annual_files[year] = self._out_dir.joinpath(f"{year}.txt").open("w", encoding="utf-8")
-        return self._annual_files[year]
+        for speaker in self._config.speakers:
+            for path in self._config.speaker_dir(self._out_dir, speaker).glob(self._PATTERN):
+                if path.is_file() and (years is None or int(path.name[:4]) in years):
+                    path.unlink()
 
     def _close_files(self) -> None:
         """
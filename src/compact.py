@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+from collections.abc import Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    """
+    Encode a value as compact JSON, by orjson if it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes):
+    """
+    Decode compact JSON, by orjson if it is installed.
+    """
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def index_path(path: Path) -> Path:
+    """
+    Get the path of the line index of a count file.
+    """
+    return path.with_name(path.name + ".idx")
+
+
+class Writer:
+    """
+    Write a count as JSON Lines without indentation, one `[key, value]` line for each top-level key,
+    such as a period or a country. Lines are written one at a time, so a count is never encoded as a whole.
+    The offset of each line is saved in an index file, so a single key can be read without parsing the others.
+    """
+    def __init__(self, path: Path) -> None:
+        self._path: Path = path
+        self._file = None
+        self._index: dict[str, tuple[int, int]] = {}
+
+    def __enter__(self) -> "Writer":
+        self._file = self._path.open("wb")
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._file.close()
+        with index_path(self._path).open("wb") as file:
+            file.write(dumps(self._index))
+
+    def write(self, key: str, value) -> None:
+        """
+        Write the value of a key.
+        """
+        data = dumps([key, value]) + b"\n"
+        self._index[key] = (self._file.tell(), len(data))
+        self._file.write(data)
+
+    def write_all(self, count: dict) -> None:
+        """
+        Write all keys of a count.
+        """
+        for key, value in count.items():
+            self.write(key, value)
+
+
+class Reader:
+    """
+    Read a count written by `Writer`.
+    """
+    def __init__(self, path: Path) -> None:
+        self._path: Path = path
+        self._index: dict[str, list[int]] | None = None
+        if index_path(path).exists():
+            with index_path(path).open("rb") as file:
+                self._index = loads(file.read())
+
+    def keys(self) -> list[str]:
+        """
+        Get all keys.
+        """
+        if self._index is not None:
+            return list(self._index.keys())
+        return [key for key, _ in self.items()]
+
+    def get(self, key: str):
+        """
+        Get the value of a key, or `None` if it does not exist.
+        """
+        for _, value in self.items([key]):
+            return value
+        return None
+
+    def items(self, keys: Iterable[str] | None = None) -> Iterator[tuple[str, object]]:
+        """
+        Read key-value pairs.
+
+        -- PARAMETERS --
+        keys: The keys to be read. `None` means all keys.
+        """
+        with self._path.open("rb") as file:
+            if keys is not None and self._index is not None:
+                for key in keys:
+                    if key in self._index:
+                        offset, length = self._index[key]
+                        file.seek(offset)
+                        yield tuple(loads(file.read(length)))
+            else:
+                keys = None if keys is None else set(keys)
+                for line in file:
+                    key, value = loads(line)
+                    if keys is None or key in keys:
+                        yield key, value
@@ -0,0 +1,89 @@
+import datetime as dt
+import json
+import re
+from pathlib import Path
+from collections.abc import Sequence
+
+from presidential_term import BEGIN_YEAR, END_YEAR
+
+
+# The `strftime` formats of period labels for each granularity.
+GRANULARITIES: dict[str, str] = {
+    "year": "%Y",
+    "month": "%Y-%m",
+    "week": "%G-W%V",
+}
+
+
+class Config:
+    """
+    The date range, counting granularity and speakers of a run.
+    The default is Donald Trump's first presidential term, counted by year.
+    """
+    def __init__(self, begin: str = f"{BEGIN_YEAR}-01-01", end: str = f"{END_YEAR}-12-31",
+                 granularity: str = "year", speakers: Sequence[str] = ("Donald Trump",),
+                 tweet_speaker: str = "Donald Trump") -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        begin: The first date, such as "2017-01-20".
+        end: The last date (inclusive).
+        granularity: One of "year", "month" and "week". Statements are separated and counted by this period.
+        speakers: The presidents whose speeches are handled. All of them are handled in a single scan of each dataset.
+        tweet_speaker: The author of tweets. Tweets are only handled if the author is in `speakers`.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if len(speakers) == 0:
+            raise ValueError("At least one speaker is required.")
+        self.begin: dt.date = dt.date.fromisoformat(begin)
+        self.end: dt.date = dt.date.fromisoformat(end)
+        if self.begin > self.end:
+            raise ValueError(f"The range from {begin} to {end} is empty.")
+        self.granularity: str = granularity
+        self.speakers: list[str] = list(speakers)
+        self.tweet_speaker: str = tweet_speaker
+
+    @staticmethod
+    def load(path: Path) -> "Config":
+        """
+        Load a configuration from a JSON file, whose keys are the constructor's parameters.
+        """
+        with path.open(encoding="utf-8") as file:
+            return Config(**json.load(file))
+
+    @property
+    def format(self) -> str:
+        """
+        Get the `strftime` format of period labels.
+        """
+        return GRANULARITIES[self.granularity]
+
+    def period(self, date: dt.date) -> str:
+        """
+        Get the label of the period a date belongs to, such as "2017", "2017-01" or "2017-W03".
+        """
+        return date.strftime(self.format)
+
+    def periods(self) -> list[str]:
+        """
+        Get the labels of all periods in the range, in order.
+        """
+        periods = []
+        date = self.begin
+        while date <= self.end:
+            period = self.period(date)
+            if len(periods) == 0 or periods[-1] != period:
+                periods.append(period)
+            date += dt.timedelta(days=1)
+        return periods
+
+    def speaker_dir(self, root: Path, speaker: str) -> Path:
+        """
+        Get the directory storing a speaker's files.
+        If there is only one speaker, the root directory is used directly.
+        """
+        if len(self.speakers) == 1:
+            return root
+        return root.joinpath(re.sub(r"\W+", "-", speaker.lower()).strip("-"))
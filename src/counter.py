@@ -1,170 +1,1184 @@
 from pathlib import Path
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
 import collections as clc
+import codecs
+import copy
+import itertools
+import json
 
 import nltk
-import spacy
+import numpy as np
 
+from cache import Cache, Entry, EntryWriter
+from checkpoint import Checkpoint, State
+from compact import Reader as CompactReader, Writer as CompactWriter
+from config import Config
 from country import Container
-from presidential_term import BEGIN_YEAR, END_YEAR
+from engine import Engine, NounChunkEngine, T
+from metrics import Metrics
 
 
 class Counter:
-    def handle(self, year: int, nouns: Sequence[str]) -> None:
+    def handle(self, period: str, nouns: Sequence[str]) -> None:
         """
-        Handle nouns in a sentence corresponding to a specific year.
+        Handle nouns in a sentence corresponding to a specific period.
 
         -- PARAMETERS --
-        year: A year.
+        period: A period label, such as a year.
         nouns: A noun list.
         """
         assert False
 
+    def merge(self, other: "Counter") -> None:
+        """
+        Add the counts of another counter of the same type to this one.
+        """
+        assert False
+
+    def subtract(self, other: "Counter") -> None:
+        """
+        Remove the counts of another counter of the same type from this one, such as the counts of retracted texts.
+        Counts never go below zero.
+        """
+        assert False
+
+    def restore(self, annual: dict[str, dict]) -> None:
+        """
+        Add persisted counts for each period, which are in the same form as `annual`.
+        The total count is restored from them.
+        """
+        assert False
+
+    def flush(self) -> None:
+        """
+        Finish a stream of sentences, such as a shard or a text. Counters buffering sentences should count them now.
+        """
+        pass
+
+    def clear(self) -> None:
+        """
+        Remove all counts.
+        """
+        assert False
+
     @property
     def total(self) -> dict:
         """
-        Get the total count for 4 years.
+        Get the total count for all periods.
         """
         assert False
 
     @property
-    def annual(self) -> dict[int, dict]:
+    def annual(self) -> dict[str, dict]:
         """
-        Get the annual count for each year.
+        Get the count for each period, such as each year.
         """
         assert False
 
 
+class Shard:
+    """
+    A byte range of an annual file, or a file of another period. Only the lines starting in the range belong to it.
+    """
+    def __init__(self, path: Path, begin: int = 0, end: int | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        path: The path of an annual file.
+        begin: The beginning byte offset.
+        end: The ending byte offset (exclusive). `None` means the end of the file.
+        """
+        self.path: Path = path
+        self.begin: int = begin
+        self.end: int | None = end
+
+    @property
+    def period(self) -> str:
+        return self.path.stem
+
+    def blocks(self, size: int) -> Iterator[bytes]:
+        """
+        Read the lines belonging to the shard in byte blocks.
+
+        -- PARAMETERS --
+        size: The number of bytes read at once.
+        """
+        assert size > 0
+        with self.path.open("rb") as file:
+            if self.begin > 0:
+                # Skip the line that starts in the previous shard.
+                file.seek(self.begin - 1)
+                file.readline()
+            while self.end is None or file.tell() < self.end:
+                pos = file.tell()
+                data = file.read(size if self.end is None else min(size, self.end - pos))
+                if not data:
+                    break
+                if self.end is not None and pos + len(data) >= self.end and not data.endswith(b"\n"):
+                    # Finish the last line, which starts in this shard.
+                    data += file.readline()
+                yield data
+
+    def chunks(self, size: int) -> Iterator[str]:
+        """
+        Read the lines belonging to the shard in text chunks.
+
+        -- PARAMETERS --
+        size: The number of bytes read at once.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for data in self.blocks(size):
+            yield decoder.decode(data)
+        yield decoder.decode(b"", final=True)
+
+
+def split_file(path: Path, size: int | None = None) -> list[Shard]:
+    """
+    Split an annual file into shards.
+
+    -- PARAMETERS --
+    path: The path of an annual file.
+    size: The maximum number of bytes in a shard. `None` means the whole file is a shard.
+    """
+    assert size is None or size > 0
+    file_size = path.stat().st_size
+    if size is None or file_size <= size:
+        return [Shard(path)]
+    return [Shard(path, begin, min(begin + size, file_size)) for begin in range(0, file_size, size)]
+
+
 class Director:
     """
     Read annual files, extract nouns and send them to counters.
+    Files of other periods, such as "2017-01.txt" and "2017-W03.txt", are also supported.
     """
+    _PATTERN: str = "[0-9][0-9][0-9][0-9]*.txt"
+
     _SENTENCE_CLUSTER: int = 3
 
-    def __init__(self, in_dir: Path, counters: Sequence[Counter]) -> None:
+    _CHUNK_SIZE: int = 1024 * 1024
+
+    # The maximum number of bytes in a shard. A serial director always counts whole annual files.
+    _shard_size: int | None = None
+
+    def __init__(self, in_dir: Path, counters: Sequence[Counter], engine: Engine | None = None,
+                 cache: Cache | None = None, metrics: Metrics | None = None,
+                 checkpoint: Checkpoint | None = None, cluster: int | None = None) -> None:
         """
         The constructor.
 
         -- PARAMETERS --
         in_dir: The directory of annual files.
         counters: A counter list. The nouns in each sentence will be sent to these counters.
+        engine: An engine used to extract nouns. The default is a `NounChunkEngine`.
+        cache: A cache storing the nouns extracted from each shard. Only the shards not in it are handled by the engine.
+        metrics: A collection of the numbers of shards, sentences, tokens, clusters, noun chunks and cache hits.
+        checkpoint: A checkpoint periodically saving counters and the progress. If it is resumed,
+            counters should be empty and the counted shards and clusters are skipped.
+        cluster: The number of sentences in a cluster, whose nouns are sent to counters at once.
+            The default is 3. Windowed counters, such as `WindowDiplomacyCounter`, need single sentences.
         """
+        assert cluster is None or cluster > 0
         self._in_dir: Path = in_dir
         self._counters: Sequence[Counter] = counters
-        self._nlp = spacy.load("en_core_web_sm")
+        self._engine: Engine = engine if engine is not None else NounChunkEngine()
+        self._cache: Cache | None = cache
+        self._metrics: Metrics = metrics if metrics is not None else Metrics()
+        self._checkpoint: Checkpoint | None = checkpoint
+        self._cluster: int = cluster if cluster is not None else self._SENTENCE_CLUSTER
 
     def handle(self) -> None:
         if len(self._counters) == 0:
             return
-        for path in self._in_dir.glob("20??.txt"):
-            if not path.is_file():
+        if self._checkpoint is None:
+            self._count(self._shards(), self._counters)
+            return
+
+        shards = list(self._shards())
+        state = self._restore(shards)
+        for shard in shards:
+            key = self._key(shard)
+            if key in state.done:
+                continue
+            if state.current != key:
+                state.current, state.offset = key, 0
+            self._count_clusters(shard, state)
+            state.done.add(key)
+            state.current, state.offset = None, 0
+            self._checkpoint.save(state)
+
+    def _restore(self, shards: Sequence[Shard]) -> State:
+        """
+        Restore counters and the progress from the checkpoint.
+        If annual files have been changed since the checkpoint was saved, it is ignored.
+        A checkpoint saved by another kind of director or with another shard size cannot be resumed,
+        because its shards and its progress inside them are different.
+        """
+        state = self._checkpoint.load()
+        director = type(self).__name__
+        if state is not None and (state.director, state.shard_size) != (director, self._shard_size):
+            raise ValueError(f"The checkpoint was saved by a {state.director} with a shard size of {state.shard_size}, "
+                             f"but it is resumed by a {director} with a shard size of {self._shard_size}.")
+        keys = {self._key(shard) for shard in shards}
+        if state is None or not state.done <= keys or (state.current is not None and state.current not in keys):
+            return State(self._counters, set(), director=director, shard_size=self._shard_size)
+        for counter, saved in zip(self._counters, state.counters):
+            counter.merge(saved)
+        state.counters = self._counters
+        return state
+
+    @staticmethod
+    def _key(shard: Shard) -> str:
+        return Checkpoint.key(shard.path, shard.begin, shard.end)
+
+    def _count_clusters(self, shard: Shard, state: State) -> None:
+        """
+        Count a shard cluster by cluster, skipping the clusters counted before the checkpoint was saved,
+        and save the progress periodically.
+        If the shard is in the cache, its nouns are counted at once. Otherwise the nouns extracted are only stored
+        in the cache if the whole shard has been extracted in this run.
+        """
+        writer = None
+        if self._cache is not None:
+            key = self._cache.key(shard.blocks(self._CHUNK_SIZE), self._cache_version())
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._metrics.count("analyze.cache_hits")
+                self._count_size(cached)
+                nouns = itertools.islice(cached.nouns, state.offset, None)
+                self._count_nouns(((i, shard.period) for i in nouns), self._counters)
+                return
+            self._metrics.count("analyze.cache_misses")
+            writer = self._cache.writer(key) if state.offset == 0 else None
+
+        clusters = itertools.islice(self._clusters([shard], writer), state.offset, None)
+        for nouns, period in self._extract(clusters):
+            for counter in self._counters:
+                counter.handle(period, nouns)
+            if writer is not None:
+                writer.append(nouns)
+            state.offset += 1
+            if self._checkpoint.due():
+                self._checkpoint.save(state)
+        for counter in self._counters:
+            counter.flush()
+        if writer is not None:
+            writer.close()
+
+    def _shards(self) -> Iterator[Shard]:
+        """
+        Get all annual files as shards.
+        """
+        for path in sorted(self._in_dir.glob(self._PATTERN)):
+            if path.is_file():
+                yield Shard(path)
+
+    def _count(self, shards: Iterable[Shard], counters: Sequence[Counter]) -> None:
+        """
+        Extract nouns from shards and send them to counters.
+        """
+        self._count_nouns(self._nouns(shards), counters)
+
+    def _count_nouns(self, nouns: Iterable[tuple[list[str], str]], counters: Sequence[Counter]) -> None:
+        """
+        Send the nouns of each sentence cluster to counters.
+        """
+        for cluster, period in nouns:
+            # A cluster is only handled once and its nouns are shared by all counters.
+            for counter in counters:
+                counter.handle(period, cluster)
+        for counter in counters:
+            counter.flush()
+
+    def _nouns(self, shards: Iterable[Shard]) -> Iterator[tuple[list[str], str]]:
+        """
+        Extract nouns from each sentence cluster in shards, along with its period.
+        """
+        if self._cache is None:
+            yield from self._extract(self._clusters(shards))
+            return
+
+        version = self._cache_version()
+        misses: list[tuple[Shard, EntryWriter] | None] = []
+        for shard in shards:
+            key = self._cache.key(shard.blocks(self._CHUNK_SIZE), version)
+            cached = self._cache.get(key)
+            if cached is None:
+                misses.append((shard, self._cache.writer(key)))
+                self._metrics.count("analyze.cache_misses")
+            else:
+                self._metrics.count("analyze.cache_hits")
+                self._count_size(cached)
+                yield from ((i, shard.period) for i in cached.nouns)
+
+        def clusters() -> Iterator[tuple[str, int]]:
+            for i, (shard, writer) in enumerate(misses):
+                for cluster, _ in self._clusters([shard], writer):
+                    yield cluster, i
+
+        # All missing shards are handled by the engine at once, but stored separately.
+        # A shard has been grouped completely when the engine returns the nouns of a later one,
+        # and its writer is released once it has been closed.
+        current = 0
+        for extracted, i in self._extract(clusters()):
+            while current < i:
+                misses[current][1].close()
+                misses[current], current = None, current + 1
+            misses[i][1].append(extracted)
+            yield extracted, misses[i][0].period
+        while current < len(misses):
+            misses[current][1].close()
+            misses[current], current = None, current + 1
+
+    def _extract(self, clusters: Iterable[tuple[str, T]]) -> Iterator[tuple[list[str], T]]:
+        """
+        Extract nouns from sentence clusters by the engine, and count the noun chunks it has parsed.
+        """
+        chunks = self._engine.chunks
+        yield from self._engine.extract(clusters)
+        self._metrics.count("analyze.noun_chunks", self._engine.chunks - chunks)
+
+    def _count_size(self, cached: Entry) -> None:
+        """
+        Count the size of a cached shard, so cached runs report the same amount of text as uncached ones.
+        """
+        self._metrics.count("analyze.shards")
+        self._metrics.count("analyze.sentences", cached.sentences)
+        self._metrics.count("analyze.tokens", cached.tokens)
+        self._metrics.count("analyze.clusters", cached.clusters)
+
+    def _cache_version(self) -> str:
+        """
+        Get the version of cached nouns, which changes with the engine and the number of sentences in a cluster.
+        """
+        return f"{self._engine.version}/{self._cluster}"
+
+    def clusters(self) -> Iterator[tuple[str, str]]:
+        """
+        Get all sentence clusters in annual files, along with their periods.
+        """
+        return self._clusters(self._shards())
+
+    def count_texts(self, texts: Iterable[tuple[str, str]]) -> None:
+        """
+        Count texts instead of annual files.
+
+        -- PARAMETERS --
+        texts: Texts along with their periods. Sentence clusters and windows never cross texts.
+        """
+        # Each text is tagged with its index, so counters can be flushed at the end of each text.
+        current = 0
+        for nouns, (period, i) in self.extract_texts((text, (period, i)) for i, (text, period) in enumerate(texts)):
+            if i != current:
+                for counter in self._counters:
+                    counter.flush()
+                current = i
+            for counter in self._counters:
+                counter.handle(period, nouns)
+        for counter in self._counters:
+            counter.flush()
+
+    def extract_texts(self, texts: Iterable[tuple[str, T]]) -> Iterator[tuple[list[str], T]]:
+        """
+        Extract nouns from each sentence cluster in texts. Sentence clusters never cross texts.
+
+        -- PARAMETERS --
+        texts: Texts along with their tags, such as periods or document IDs.
+
+        -- RETURNS --
+        The nouns of each cluster along with the tag of its text, in order.
+        """
+        clusters = ((cluster, tag) for text, tag in texts for cluster, _ in self._group(nltk.sent_tokenize(text), tag))
+        return self._extract(clusters)
+
+    def _clusters(self, shards: Iterable[Shard], writer: EntryWriter | None = None) -> Iterator[tuple[str, str]]:
+        """
+        Make every several sentences in shards a group, along with its period.
+
+        -- PARAMETERS --
+        shards: Shards.
+        writer: A cache writer whose size is increased by the sentences and tokens in shards.
+        """
+        for shard in shards:
+            self._metrics.count("analyze.shards")
+            yield from self._group(self._sentences(shard), shard.period, writer)
+
+    def _group(self, sentences: Iterable[str], period: str,
+               writer: EntryWriter | None = None) -> Iterator[tuple[str, str]]:
+        """
+        Make every several sentences a group, along with their period.
+        Tokens are only separated by whitespaces, so they can be counted without any NLP model.
+        """
+        cluster, num, tokens = [], 0, 0
+        for sentence in sentences:
+            cluster.append(sentence)
+            num += 1
+            tokens += len(sentence.split())
+            if len(cluster) == self._cluster:
+                yield "".join(cluster), period
+                cluster.clear()
+        if len(cluster) > 0:
+            yield "".join(cluster), period
+        self._metrics.count("analyze.sentences", num)
+        self._metrics.count("analyze.tokens", tokens)
+        self._metrics.count("analyze.clusters", (num + self._cluster - 1) // self._cluster)
+        if writer is not None:
+            writer.sentences += num
+            writer.tokens += tokens
+
+    def _sentences(self, shard: Shard) -> Iterator[str]:
+        """
+        Split a shard into sentences chunk by chunk, so the memory usage does not depend on the size of the shard.
+        """
+        remain = ""
+        for chunk in shard.chunks(self._CHUNK_SIZE):
+            if len(chunk) == 0:
                 continue
-            with path.open(encoding="utf-8") as file:
-                sentences = nltk.sent_tokenize(file.read())
-                for i in range(0, len(sentences), self._SENTENCE_CLUSTER):
-                    # Several sentences are made a group.
-                    sentence_num = min(self._SENTENCE_CLUSTER, len(sentences) - i)
-                    cluster = "".join([sentences[j] for j in range(i, i + sentence_num)])
-                    for counter in self._counters:
-                        nouns = self._nlp(cluster).noun_chunks
-                        counter.handle(int(path.stem), [i.text for i in nouns])
+            text = remain + chunk
+            sentences = nltk.sent_tokenize(text)
+            if len(sentences) == 0:
+                remain = ""
+                continue
+            # The last sentence might be cut off by the chunk, so it is carried over to the next chunk.
+            # Sentences are slices of the text, and the carried text keeps its original whitespaces.
+            remain = text[text.rindex(sentences[-1]):]
+            yield from sentences[:-1]
+        if len(remain) > 0:
+            yield from nltk.sent_tokenize(remain)
+
+
+class ParallelDirector(Director):
+    """
+    Count annual files or their byte ranges concurrently in a process pool.
+    Each worker counts a shard into its own copies of counters, which are merged into the original counters later.
+    """
+    def __init__(self, in_dir: Path, counters: Sequence[Counter], engine: Engine | None = None,
+                 processes: int | None = None, shard_size: int | None = None, cache: Cache | None = None,
+                 metrics: Metrics | None = None, checkpoint: Checkpoint | None = None,
+                 cluster: int | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        in_dir: The directory of annual files.
+        counters: A counter list. The nouns in each sentence will be sent to these counters.
+        engine: An engine used to extract nouns in each worker. The default is a `NounChunkEngine`.
+            Its own parallelism should be disabled.
+        processes: The number of worker processes. `None` means the number of CPUs.
+        shard_size: The maximum number of bytes counted by a worker at once. `None` means a whole annual file.
+            Sentence clusters never cross shards.
+        cache: A cache storing the nouns extracted from each shard. Only the shards not in it are handled by the engine.
+        metrics: A collection of the numbers of shards, sentences, tokens, clusters, noun chunks and cache hits
+            in all workers.
+        checkpoint: A checkpoint periodically saving counters and the shards that have been merged.
+            If it is resumed, counters should be empty and the counted shards are skipped.
+        cluster: The number of sentences in a cluster. The default is 3.
+        """
+        super().__init__(in_dir, counters, engine, cache, metrics, checkpoint, cluster)
+        assert processes is None or processes > 0
+        self._processes: int | None = processes
+        self._shard_size: int | None = shard_size
+
+    def handle(self) -> None:
+        if len(self._counters) == 0:
+            return
+        shards = [shard for file in self._shards() for shard in split_file(file.path, self._shard_size)]
+        state = self._restore(shards) if self._checkpoint is not None else None
+        if state is not None:
+            # Shards are only recorded when they have been merged, so there is no progress inside a shard.
+            assert state.current is None
+            shards = [shard for shard in shards if self._key(shard) not in state.done]
+        with ProcessPoolExecutor(max_workers=self._processes, initializer=_init_worker,
+                                 initargs=(self._in_dir, self._counters, self._engine, self._cache,
+                                           self._cluster)) as executor:
+            for shard, (counters, metrics) in zip(shards, executor.map(_count_shard, shards)):
+                for counter, result in zip(self._counters, counters):
+                    counter.merge(result)
+                self._metrics.merge(metrics)
+                if state is not None:
+                    state.done.add(self._key(shard))
+                    if self._checkpoint.due():
+                        self._checkpoint.save(state)
+        if state is not None:
+            self._checkpoint.save(state)
+
+
+_worker: Director = None
+
+_worker_counters: Sequence[Counter] = None
+
+
+def _init_worker(in_dir: Path, counters: Sequence[Counter], engine: Engine, cache: Cache | None,
+                 cluster: int) -> None:
+    """
+    Initialize a worker process of `ParallelDirector` with empty copies of counters.
+    """
+    global _worker, _worker_counters
+    for counter in counters:
+        counter.clear()
+    _worker_counters = counters
+    _worker = Director(in_dir, counters, engine, cache, cluster=cluster)
+
+
+def _count_shard(shard: Shard) -> tuple[Sequence[Counter], Metrics]:
+    """
+    Count a shard in a worker process of `ParallelDirector`.
+    """
+    counters = copy.deepcopy(_worker_counters)
+    _worker._metrics = Metrics()
+    _worker._count([shard], counters)
+    return counters, _worker._metrics
 
 
 class NormalCounter(Counter):
     """
     Count the number of times each country has been mentioned.
     """
-    def __init__(self, countries: Container) -> None:
+    def __init__(self, countries: Container, periods: Iterable[str] | None = None) -> None:
         """
         The constructor.
 
         -- PARAMETERS --
         countries: A country container.
+        periods: The labels of periods. The default is the years of Donald Trump's first presidential term.
         """
         super().__init__()
         self._countries: Container = countries
         self._total: clc.Counter = clc.Counter()
-        self._annual: dict[int, clc.Counter] = {year: clc.Counter() for year in range(BEGIN_YEAR, END_YEAR + 1)}
+        periods = periods if periods is not None else Config().periods()
+        self._annual: dict[str, clc.Counter] = {period: clc.Counter() for period in periods}
 
-    def handle(self, year: int, nouns: Sequence[str]) -> None:
+    def handle(self, period: str, nouns: Sequence[str]) -> None:
         for word in nouns:
-            if self._countries.contain(word):
-                self.add_record(year, word)
+            name = self._countries.main_name(word)
+            if name:
+                self._add_record(period, name)
 
-    def add_record(self, year: int, country: str, count: int = 1) -> None:
+    def add_record(self, period: str, country: str, count: int = 1) -> None:
         """
         Add a new record.
 
         -- PARAMETERS --
-        year: A year.
+        period: A period label.
         country: A country.
         count: The number of count increase.
         """
-        country = self._countries.main_name(country)
-        self._total[country] += count
-        self._annual[year][country] += count
+        self._add_record(period, self._countries.main_name(country), count)
+
+    def _add_record(self, period: str, name: str, count: int = 1) -> None:
+        """
+        Add a new record for a country's main name.
+        """
+        self._total[name] += count
+        self._annual[period][name] += count
+
+    def merge(self, other: "NormalCounter") -> None:
+        self._total.update(other._total)
+        for period, count in other._annual.items():
+            self._annual.setdefault(period, clc.Counter()).update(count)
+
+    def subtract(self, other: "NormalCounter") -> None:
+        self._total.subtract(other.total)
+        # Unary plus removes zero and negative counts.
+        self._total = +self._total
+        for period, count in other.annual.items():
+            if period in self._annual:
+                self._annual[period].subtract(count)
+                self._annual[period] = +self._annual[period]
+
+    def restore(self, annual: dict[str, dict[str, int]]) -> None:
+        for period, count in annual.items():
+            if period not in self._annual:
+                self._annual[period] = clc.Counter()
+            for country, num in count.items():
+                self._add_record(period, self._countries.main_name(country), num)
+
+    def clear(self) -> None:
+        self._total.clear()
+        for count in self._annual.values():
+            count.clear()
 
     @property
     def total(self) -> clc.Counter:
         return self._total
 
     @property
-    def annual(self) -> dict[int, clc.Counter]:
+    def annual(self) -> dict[str, clc.Counter]:
         return self._annual
 
 
+class ArrayNormalCounter(NormalCounter):
+    """
+    Count mentions like `NormalCounter`, but store them in a dense (period × country) array indexed by country IDs.
+    Records are buffered and added to the array in batches, and the total count is only computed when needed.
+    """
+    _BATCH_SIZE: int = 1 << 16
+
+    def __init__(self, countries: Container, periods: Iterable[str] | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        periods: The labels of periods. The default is the years of Donald Trump's first presidential term.
+        """
+        super().__init__(countries, [])
+        self._names: list[str] = countries.all()
+        self._ids: dict[str, int] = {name: i for i, name in enumerate(self._names)}
+        periods = periods if periods is not None else Config().periods()
+        self._periods: dict[str, int] = {period: i for i, period in enumerate(periods)}
+        self._counts: np.ndarray = np.zeros((len(self._periods), len(self._names)), dtype=np.int64)
+        self._pending: list[int] = []
+
+    def save(self, path: Path) -> None:
+        """
+        Save counts to a single binary file.
+        """
+        self._fold()
+        with path.open("wb") as file:
+            np.savez_compressed(file, counts=self._counts, periods=np.array(list(self._periods), dtype=str),
+                                countries=np.array(self._names, dtype=str))
+
+    @staticmethod
+    def load(path: Path, countries: Container) -> "ArrayNormalCounter":
+        """
+        Load counts saved by `save`.
+        """
+        with np.load(path) as data:
+            counter = ArrayNormalCounter(countries, data["periods"].tolist())
+            other = ArrayNormalCounter(countries, data["periods"].tolist())
+            other._names = data["countries"].tolist()
+            other._counts = data["counts"]
+        # Country IDs might be changed if the country list has been changed.
+        counter.merge(other)
+        return counter
+
+    def _add_record(self, period: str, name: str, count: int = 1) -> None:
+        # A record is stored as a flat index into the array.
+        index = self._periods[period] * len(self._names) + self._ids[name]
+        self._pending.extend([index] * count)
+        if len(self._pending) >= self._BATCH_SIZE:
+            self._fold()
+
+    def merge(self, other: "ArrayNormalCounter") -> None:
+        self._fold()
+        other._fold()
+        for period in other._periods:
+            if period not in self._periods:
+                self._periods[period] = len(self._periods)
+                self._counts = np.vstack([self._counts, np.zeros((1, len(self._names)), dtype=np.int64)])
+        rows = np.array([self._periods[period] for period in other._periods], dtype=np.int64)
+        if other._names == self._names:
+            self._counts[rows] += other._counts
+            return
+        columns = np.array([self._ids.get(name, -1) for name in other._names], dtype=np.int64)
+        known = columns >= 0
+        self._counts[np.ix_(rows, columns[known])] += other._counts[:, known]
+
+    def subtract(self, other: "ArrayNormalCounter") -> None:
+        other._fold()
+        negative = copy.copy(other)
+        negative._counts, negative._pending = -other._counts, []
+        self.merge(negative)
+        np.maximum(self._counts, 0, out=self._counts)
+
+    def restore(self, annual: dict[str, dict[str, int]]) -> None:
+        other = ArrayNormalCounter(self._countries, annual.keys())
+        for period, count in annual.items():
+            for country, num in count.items():
+                other._counts[other._periods[period], other._ids[self._countries.main_name(country)]] += num
+        self.merge(other)
+
+    def clear(self) -> None:
+        self._counts[:] = 0
+        self._pending.clear()
+
+    @property
+    def counts(self) -> np.ndarray:
+        """
+        Get the (period × country) array. Rows are in the order of periods and columns are in the order of IDs.
+        """
+        self._fold()
+        return self._counts
+
+    @property
+    def total(self) -> clc.Counter:
+        return self._to_counter(self.counts.sum(axis=0))
+
+    @property
+    def annual(self) -> dict[str, clc.Counter]:
+        counts = self.counts
+        return {period: self._to_counter(counts[i]) for period, i in self._periods.items()}
+
+    def _fold(self) -> None:
+        """
+        Add buffered records to the array.
+        """
+        if len(self._pending) == 0:
+            return
+        counts = np.bincount(np.array(self._pending, dtype=np.int64), minlength=self._counts.size)
+        self._counts += counts.reshape(self._counts.shape)
+        self._pending.clear()
+
+    def _to_counter(self, counts: np.ndarray) -> clc.Counter:
+        """
+        Convert a row of counts to a counter, only containing the countries that have been mentioned.
+        """
+        return clc.Counter({self._names[i]: int(counts[i]) for i in np.flatnonzero(counts)})
+
+
 class DiplomacyCounter(Counter):
     """
     Count the numbers of times each country and diplomatic relation have been mentioned.
     """
-    def __init__(self, countries: Container, normal: NormalCounter) -> None:
+    def __init__(self, countries: Container, normal: NormalCounter, periods: Iterable[str] | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        normal: A normal counter, which is updated along with this counter.
+        periods: The labels of periods. The default is the years of Donald Trump's first presidential term.
+        """
         super().__init__()
         self._countries: Container = countries
         self._normal: NormalCounter = normal
         self._total: dict[str, clc.Counter] = {}
-        self._annual: dict[int, dict[str, clc.Counter]] = {year: {} for year in range(BEGIN_YEAR, END_YEAR + 1)}
+        periods = periods if periods is not None else Config().periods()
+        self._annual: dict[str, dict[str, clc.Counter]] = {period: {} for period in periods}
 
-    def handle(self, year: int, nouns: Sequence[str]) -> None:
+    def handle(self, period: str, nouns: Sequence[str]) -> None:
         countries: clc.Counter = clc.Counter()
         for word in nouns:
-            if self._countries.contain(word):
-                name = self._countries.main_name(word)
-                if name not in countries:
-                    countries[name] = 0
+            name = self._countries.main_name(word)
+            if name:
                 countries[name] += 1
-                self._normal.add_record(year, name)
-        self._add_records(year, countries)
+                self._normal._add_record(period, name)
+        self._add_records(period, countries)
+
+    def merge(self, other: "DiplomacyCounter") -> None:
+        """
+        Add the counts of another counter to this one.
+        The normal counter of the other one is also merged, because it is only updated by its diplomacy counter.
+        """
+        for country, relations in other._total.items():
+            self._total.setdefault(country, clc.Counter()).update(relations)
+        for period, count in other._annual.items():
+            annual = self._annual.setdefault(period, {})
+            for country, relations in count.items():
+                annual.setdefault(country, clc.Counter()).update(relations)
+        if other._normal is not self._normal:
+            self._normal.merge(other._normal)
+
+    def subtract(self, other: "DiplomacyCounter") -> None:
+        """
+        Remove the counts of another counter from this one.
+        The normal counter of the other one is also subtracted, because it is only updated by its diplomacy counter.
+        """
+        for country, relations in other._total.items():
+            if country in self._total:
+                self._total[country].subtract(relations)
+                self._total[country] = +self._total[country]
+                if len(self._total[country]) == 0:
+                    del self._total[country]
+        for period, count in other._annual.items():
+            annual = self._annual.get(period, {})
+            for country, relations in count.items():
+                if country in annual:
+                    annual[country].subtract(relations)
+                    annual[country] = +annual[country]
+                    if len(annual[country]) == 0:
+                        del annual[country]
+        if other._normal is not self._normal:
+            self._normal.subtract(other._normal)
+
+    def restore(self, annual: dict[str, dict[str, dict[str, int]]]) -> None:
+        """
+        Add persisted counts for each period. The normal counter should be restored separately,
+        because mentions without relations are not in diplomacy counts.
+        """
+        for period, count in annual.items():
+            self._annual.setdefault(period, {})
+            for country, relations in count.items():
+                country = self._countries.main_name(country)
+                self._init_counts(period, country)
+                for relation, num in relations.items():
+                    relation = self._countries.main_name(relation)
+                    self._total[country][relation] += num
+                    self._annual[period][country][relation] += num
+
+    def clear(self) -> None:
+        """
+        Remove all counts, including the ones in the normal counter.
+        """
+        self._total.clear()
+        for count in self._annual.values():
+            count.clear()
+        self._normal.clear()
 
     @property
     def total(self) -> dict[str, clc.Counter]:
         return self._total
 
     @property
-    def annual(self) -> dict[int, dict[str, clc.Counter]]:
+    def annual(self) -> dict[str, dict[str, clc.Counter]]:
         return self._annual
 
-    def _add_records(self, year: int, countries: clc.Counter) -> None:
+    def _add_records(self, period: str, countries: Iterable[str]) -> None:
         """
         Add new records.
 
         -- PARAMETERS --
-        year: A year.
+        period: A period label.
         countries: A country list. These countries are mentioned together.
         """
         for country in countries:
             for relation in countries:
                 if relation == country:
                     continue
-                self._init_counts(year, country)
+                self._init_counts(period, country)
                 self._total[country][relation] += 1
-                self._annual[year][country][relation] += 1
+                self._annual[period][country][relation] += 1
 
-    def _init_counts(self, year: int, country: str) -> None:
+    def _init_counts(self, period: str, country: str) -> None:
         """
         Initialize a counter to store records for a country.
         """
         if country not in self._total:
             self._total[country] = clc.Counter()
-        if country not in self._annual[year]:
-            self._annual[year][country] = clc.Counter()
+        if country not in self._annual[period]:
+            self._annual[period][country] = clc.Counter()
+
+
+class WindowDiplomacyCounter(DiplomacyCounter):
+    """
+    Count diplomatic relations between the countries mentioned in a sliding window of sentences,
+    instead of in a sentence cluster. It should be fed with the nouns of single sentences.
+    The countries of each sentence are kept in a window, so overlapping windows never parse a sentence twice,
+    and counters of different window sizes can share the nouns extracted in one pass.
+    Windows never cross periods, shards or texts.
+    """
+    def __init__(self, countries: Container, normal: NormalCounter, periods: Iterable[str] | None = None,
+                 window: int = 3, stride: int = 1) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        normal: A normal counter, which is updated along with this counter.
+        periods: The labels of periods. The default is the years of Donald Trump's first presidential term.
+        window: The number of sentences in a window.
+        stride: The number of sentences between the beginnings of two windows.
+            If it equals the window size, windows do not overlap like sentence clusters.
+        """
+        super().__init__(countries, normal, periods)
+        assert window > 0 and stride > 0
+        self._size: int = window
+        self._stride: int = stride
+        self._window: clc.deque[set[str]] = clc.deque(maxlen=window)
+        self._period: str | None = None
+        # The number of sentences in the current stream, the beginning of the next window and the end of the last one.
+        self._num: int = 0
+        self._next: int = 0
+        self._last: int = 0
+
+    @property
+    def window(self) -> int:
+        return self._size
+
+    @property
+    def stride(self) -> int:
+        return self._stride
+
+    def handle(self, period: str, nouns: Sequence[str]) -> None:
+        if period != self._period:
+            self.flush()
+            self._period = period
+        countries = set()
+        for word in nouns:
+            name = self._countries.main_name(word)
+            if name:
+                countries.add(name)
+                self._normal._add_record(period, name)
+        self._window.append(countries)
+        self._num += 1
+        if self._num - self._next == self._size:
+            self._add_records(period, set().union(*self._window))
+            self._last = self._num
+            self._next += self._stride
+
+    def merge(self, other: "WindowDiplomacyCounter") -> None:
+        """
+        Add the counts of another counter to this one.
+        If this counter has not received any sentence of the current stream, it also takes the window of the other one,
+        so a counter restored from a checkpoint continues the window where it was interrupted.
+        """
+        super().merge(other)
+        if self._num == 0 and other._num > 0:
+            self._window = other._window.copy()
+            self._period = other._period
+            self._num, self._next, self._last = other._num, other._next, other._last
+
+    def flush(self) -> None:
+        """
+        Count the last window if it has sentences not in any counted window, and start a new stream.
+        """
+        if self._num > max(self._next, self._last):
+            tail = itertools.islice(self._window, len(self._window) - (self._num - self._next), None)
+            self._add_records(self._period, set().union(*tail))
+        self._window.clear()
+        self._num, self._next, self._last = 0, 0, 0
+
+    def clear(self) -> None:
+        super().clear()
+        self._window.clear()
+        self._period = None
+        self._num, self._next, self._last = 0, 0, 0
+
+
+class MatrixDiplomacyCounter(Counter):
+    """
+    Count diplomatic relations like `DiplomacyCounter`, but store them as sparse matrices indexed by country IDs.
+    The pairs of several sentence clusters are buffered and folded into the matrices at once.
+    """
+    _BATCH_SIZE: int = 1 << 16
+
+    def __init__(self, countries: Container, normal: NormalCounter, periods: Iterable[str] | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        normal: A normal counter, which is updated along with this counter.
+        periods: The labels of periods. The default is the years of Donald Trump's first presidential term.
+        """
+        super().__init__()
+        self._countries: Container = countries
+        self._names: list[str] = countries.all()
+        self._normal: NormalCounter = normal
+        periods = periods if periods is not None else Config().periods()
+        # A pair is stored as a key `country * size + relation`. Keys are sorted and unique.
+        self._keys: dict[str, np.ndarray] = {period: _EMPTY_KEYS for period in periods}
+        self._counts: dict[str, np.ndarray] = {period: _EMPTY_COUNTS for period in periods}
+        self._pending: dict[str, list[np.ndarray]] = {}
+        self._pending_size: int = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Get the number of countries, which is the size of each matrix.
+        """
+        return len(self._names)
+
+    def handle(self, period: str, nouns: Sequence[str]) -> None:
+        ids = []
+        for word in nouns:
+            name = self._countries.main_name(word)
+            if name:
+                ids.append(self._countries.index(name))
+                self._normal._add_record(period, name)
+        if len(ids) < 2:
+            return
+        ids = np.unique(np.array(ids, dtype=np.int64))
+        if len(ids) < 2:
+            return
+        keys = (ids[:, None] * self.size + ids[None, :])[~np.eye(len(ids), dtype=bool)]
+        self._pending.setdefault(period, []).append(keys)
+        self._pending_size += len(keys)
+        if self._pending_size >= self._BATCH_SIZE:
+            self._fold()
+
+    def matrix(self, period: str | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the relation matrix of a period in the coordinate format.
+
+        -- PARAMETERS --
+        period: A period label. `None` means all periods.
+
+        -- RETURNS --
+        The row (country) IDs, column (relation) IDs and counts.
+        """
+        keys, counts = self._matrix(period)
+        return keys // self.size, keys % self.size, counts
+
+    def top(self, country: str, num: int, period: str | None = None) -> list[tuple[str, int]]:
+        """
+        Get the top relations of a country.
+
+        -- PARAMETERS --
+        country: A country.
+        num: The number of relations.
+        period: A period label. `None` means all periods.
+        """
+        keys, counts = self._matrix(period)
+        id = self._countries.index(country)
+        if id < 0:
+            return []
+        begin, end = np.searchsorted(keys, [id * self.size, (id + 1) * self.size])
+        row = counts[begin:end]
+        # Stable sorting keeps relations with the same count in the order of IDs.
+        order = np.argsort(-row, kind="stable")[:num]
+        return [(self._names[keys[begin + i] % self.size], int(row[i])) for i in order]
+
+    def merge(self, other: "MatrixDiplomacyCounter") -> None:
+        """
+        Add the counts of another counter to this one.
+        The normal counter of the other one is also merged, because it is only updated by its diplomacy counter.
+        """
+        self._fold()
+        other._fold()
+        for period in other._keys:
+            keys, counts = self._keys.get(period, _EMPTY_KEYS), self._counts.get(period, _EMPTY_COUNTS)
+            self._keys[period], self._counts[period] = _combine([keys, other._keys[period]],
+                                                                [counts, other._counts[period]])
+        if other._normal is not self._normal:
+            self._normal.merge(other._normal)
+
+    def subtract(self, other: "MatrixDiplomacyCounter") -> None:
+        """
+        Remove the counts of another counter from this one.
+        The normal counter of the other one is also subtracted, because it is only updated by its diplomacy counter.
+        """
+        self._fold()
+        other._fold()
+        for period in other._keys:
+            keys, counts = _combine([self._keys.get(period, _EMPTY_KEYS), other._keys[period]],
+                                    [self._counts.get(period, _EMPTY_COUNTS), -other._counts[period]])
+            # Counts never go below zero, and pairs without counts are removed.
+            positive = counts > 0
+            self._keys[period], self._counts[period] = keys[positive], counts[positive]
+        if other._normal is not self._normal:
+            self._normal.subtract(other._normal)
 
+    def restore(self, annual: dict[str, dict[str, dict[str, int]]]) -> None:
+        """
+        Add persisted counts for each period. The normal counter should be restored separately,
+        because mentions without relations are not in diplomacy counts.
+        Countries not in the country list are ignored.
+        """
+        self._fold()
+        for period, count in annual.items():
+            keys, counts = [], []
+            for country, relations in count.items():
+                country = self._countries.index(country)
+                for relation, num in relations.items():
+                    relation = self._countries.index(relation)
+                    if country >= 0 and relation >= 0:
+                        keys.append(country * self.size + relation)
+                        counts.append(num)
+            self._keys[period], self._counts[period] = _combine(
+                [self._keys.get(period, _EMPTY_KEYS), np.array(keys, dtype=np.int64)],
+                [self._counts.get(period, _EMPTY_COUNTS), np.array(counts, dtype=np.int64)])
+
+    def clear(self) -> None:
+        """
+        Remove all counts, including the ones in the normal counter.
+        """
+        for period in self._keys:
+            self._keys[period], self._counts[period] = _EMPTY_KEYS, _EMPTY_COUNTS
+        self._pending.clear()
+        self._pending_size = 0
+        self._normal.clear()
+
+    @property
+    def total(self) -> dict[str, clc.Counter]:
+        return self._to_dict(*self._matrix(None))
+
+    @property
+    def annual(self) -> dict[str, dict[str, clc.Counter]]:
+        self._fold()
+        return {period: self._to_dict(self._keys[period], self._counts[period]) for period in self._keys}
+
+    def _matrix(self, period: str | None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the sorted keys and counts of a period. `None` means all periods.
+        """
+        self._fold()
+        if period is not None:
+            return self._keys.get(period, _EMPTY_KEYS), self._counts.get(period, _EMPTY_COUNTS)
+        return _combine(list(self._keys.values()), list(self._counts.values()))
+
+    def _fold(self) -> None:
+        """
+        Fold buffered pairs into matrices.
+        """
+        for period, pending in self._pending.items():
+            keys = np.concatenate(pending)
+            self._keys[period], self._counts[period] = _combine(
+                [self._keys.get(period, _EMPTY_KEYS), keys],
+                [self._counts.get(period, _EMPTY_COUNTS), np.ones(len(keys), dtype=np.int64)])
+        self._pending.clear()
+        self._pending_size = 0
+
+    def _to_dict(self, keys: np.ndarray, counts: np.ndarray) -> dict[str, clc.Counter]:
+        """
+        Convert a matrix to nested counters like the ones of `DiplomacyCounter`.
+        """
+        res: dict[str, clc.Counter] = {}
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            country, relation = divmod(key, self.size)
+            res.setdefault(self._names[country], clc.Counter())[self._names[relation]] = count
+        return res
+
+
+_EMPTY_KEYS: np.ndarray = np.zeros(0, dtype=np.int64)
+
+_EMPTY_COUNTS: np.ndarray = np.zeros(0, dtype=np.int64)
+
+
+def _combine(keys: Sequence[np.ndarray], counts: Sequence[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the counts of the same keys in several sparse vectors.
+
+    -- RETURNS --
+    Sorted unique keys and their counts.
+    """
+    keys, counts = np.concatenate(keys), np.concatenate(counts)
+    if len(keys) == 0:
+        return _EMPTY_KEYS, _EMPTY_COUNTS
+    res, inverse = np.unique(keys, return_inverse=True)
+    return res, np.bincount(inverse, weights=counts, minlength=len(res)).astype(np.int64)
+
+
+def write_counts(counter: Counter, out_dir: Path, compact: bool = False, indent: int | None = 4) -> None:
+    """
+    Write the total and annual counts of a counter to "total_count" and "annual_count" files.
+
+    -- PARAMETERS --
+    counter: A counter.
+    out_dir: The directory of count files.
+    compact: Whether to write JSON Lines by `compact.Writer` instead of JSON files.
+    indent: The indentation of JSON files.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if compact:
+        with CompactWriter(out_dir.joinpath("total_count.jsonl")) as writer:
+            writer.write_all(counter.total)
+        with CompactWriter(out_dir.joinpath("annual_count.jsonl")) as writer:
+            writer.write_all(counter.annual)
+        return
+    with out_dir.joinpath("total_count.json").open("w", encoding="utf-8") as file:
+        file.write(json.dumps(counter.total, indent=indent))
+    with out_dir.joinpath("annual_count.json").open("w", encoding="utf-8") as file:
+        file.write(json.dumps(counter.annual, indent=indent))
+
+
+def read_counts(counter: Counter, out_dir: Path, compact: bool = False) -> None:
+    """
+    Restore a counter from the annual count written by `write_counts`.
+
+    -- PARAMETERS --
+    counter: A counter.
+    out_dir: The directory of count files.
+    compact: Whether counts have been written as JSON Lines.
+    """
+    path = out_dir.joinpath("annual_count.jsonl" if compact else "annual_count.json")
+    if not path.exists():
+        raise FileNotFoundError(f"No counts have been written to {path}.")
+    if compact:
+        counter.restore(dict(CompactReader(path).items()))
+        return
+    with path.open(encoding="utf-8") as file:
+        counter.restore(json.load(file))
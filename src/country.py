@@ -1,6 +1,11 @@
+import hashlib
 import json
+import re
+from collections.abc import Iterable
 from pathlib import Path
 
+import numpy as np
+
 
 class Location:
     """
@@ -23,6 +28,7 @@ class Container:
             countries = json.load(file)
         self._locations: dict[str, Location] = {}
         self._synonyms: dict[str, str] = {}
+        self._ids: dict[str, int] = {}
         for country in countries:
             if type(country["country"]) is str:
                 name = country["country"]
@@ -34,6 +40,10 @@ class Container:
                 self._locations[main_name] = Location(country["latitude"], country["longitude"])
                 for i in range(0, len(names)):
                     self._synonyms[names[i].upper()] = main_name
+        for i, name in enumerate(self._locations.keys()):
+            self._ids[name] = i
+        self._latitudes: np.ndarray = np.array([loc.latitude for loc in self._locations.values()], dtype=float)
+        self._longitudes: np.ndarray = np.array([loc.longitude for loc in self._locations.values()], dtype=float)
 
     def all(self) -> list[str]:
         """
@@ -41,6 +51,40 @@ class Container:
         """
         return list(self._locations.keys())
 
+    @property
+    def version(self) -> str:
+        """
+        Get a hash of all names, which changes whenever the country list changes.
+        """
+        return hashlib.sha256(json.dumps(sorted(self._synonyms.items())).encode("utf-8")).hexdigest()[:16]
+
+    def synonyms(self) -> dict[str, str]:
+        """
+        Get all upper-case names and their main names.
+        """
+        return dict(self._synonyms)
+
+    def index(self, name: str) -> int:
+        """
+        Get a country's ID, which is its position in `all()`.
+        If the name is not in the country list, return -1.
+        """
+        return self._ids.get(self.main_name(name), -1)
+
+    @property
+    def latitudes(self) -> np.ndarray:
+        """
+        Get the latitudes of all countries, indexed by country IDs.
+        """
+        return self._latitudes
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        """
+        Get the longitudes of all countries, indexed by country IDs.
+        """
+        return self._longitudes
+
     def contain(self, name: str) -> bool:
         """
         Check whether a name is in the country list.
@@ -64,3 +108,77 @@ class Container:
             return self._synonyms[name]
         else:
             return ""
+
+
+class Matcher:
+    """
+    Find all country names in a text by one compiled pattern.
+    Unlike `Container.contain`, a name can be found inside a longer text, such as "the People's Republic of China".
+    """
+    def __init__(self, countries: Container) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        """
+        self._countries: list[str] = countries.all()
+        self._version: str = countries.version
+        self._ids: dict[str, int] = {}
+        for name, main_name in countries.synonyms().items():
+            self._ids[name] = countries.index(main_name)
+        # Names are only matched at word boundaries. If several names overlap, the longest one wins.
+        self._pattern: re.Pattern = re.compile(rf"(?<!\w){_trie_pattern(self._ids.keys())}(?!\w)", re.IGNORECASE)
+
+    @property
+    def version(self) -> str:
+        """
+        Get the version of the country list.
+        """
+        return self._version
+
+    def find(self, text: str) -> list[int]:
+        """
+        Get the IDs of countries mentioned in a text, in order of occurrence.
+        """
+        return [self._ids[i.group(0).upper()] for i in self._pattern.finditer(text)]
+
+    def spans(self, text: str) -> list[tuple[int, int, int]]:
+        """
+        Get the beginning and ending character offsets and IDs of countries mentioned in a text.
+        """
+        return [(i.start(), i.end(), self._ids[i.group(0).upper()]) for i in self._pattern.finditer(text)]
+
+    def name(self, id: int) -> str:
+        """
+        Get the main name of a country by its ID.
+        """
+        return self._countries[id]
+
+    def names(self, text: str) -> list[str]:
+        """
+        Get the main names of countries mentioned in a text, in order of occurrence.
+        """
+        return [self._countries[i] for i in self.find(text)]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regular expression matching any of words.
+    Words are merged into a prefix tree, so the pattern does not try every word at each position.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        options = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != ""]
+        if len(options) == 0:
+            return ""
+        pattern = options[0] if len(options) == 1 else f"(?:{'|'.join(options)})"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
@@ -0,0 +1,279 @@
+"""
+Keep the source and document of each country mention, so counts can be aggregated again without running NLP.
+
+Run it in the `src` directory after `main.py` has written the mention table with `DOCUMENT_MENTIONS` enabled:
+
+    python document.py [--by KEY ...] [--relations] [--top N] [--out FILE]
+
+A key is "source", "speaker", "date", "year", "month" or "week". For example, `--by source month` counts
+the countries mentioned in each dataset and month.
+"""
+
+import argparse
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from config import GRANULARITIES
+from country import Container
+from counter import Director
+from engine import Engine
+from metrics import Metrics
+
+
+def number_documents(chunks: Iterable[tuple[str, pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+    """
+    Give each statement of standard datasets a sequential document ID.
+
+    -- PARAMETERS --
+    chunks: Standard dataframes, or their chunks, along with the names of their datasets.
+        Dates can be either a column or the index.
+
+    -- RETURNS --
+    Dataframes with "doc_id", "source", "speaker", "date" and "content" columns.
+    """
+    begin = 0
+    for source, data in chunks:
+        if "date" not in data.columns:
+            data = data.reset_index()
+        data = data.dropna(subset=["content"])
+        yield pd.DataFrame({
+            "doc_id": range(begin, begin + len(data)),
+            "source": source,
+            "speaker": data["speaker"].to_numpy(),
+            "date": pd.to_datetime(data["date"]).to_numpy(),
+            "content": data["content"].to_numpy(),
+        })
+        begin += len(data)
+
+
+class MentionTable:
+    """
+    Country mentions along with the documents they come from.
+    Mentions are stored by document, sentence cluster and country, and documents by their source, speaker and date,
+    so they can be counted by any of these keys.
+    """
+    _COLUMNS: list[str] = ["source", "speaker", "date"]
+
+    def __init__(self, documents: pd.DataFrame, mentions: pd.DataFrame) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        documents: A dataframe with "doc_id", "source", "speaker" and "date" columns.
+        mentions: A dataframe with "doc_id", "cluster", "country" and "count" columns.
+            A row is the number of times a country is mentioned in a sentence cluster of a document.
+        """
+        self.documents: pd.DataFrame = documents
+        self.mentions: pd.DataFrame = mentions
+
+    @staticmethod
+    def keys() -> list[str]:
+        """
+        Get all keys that mentions can be counted by.
+        """
+        return MentionTable._COLUMNS + list(GRANULARITIES)
+
+    @staticmethod
+    def load(dir: Path) -> "MentionTable":
+        """
+        Load a table saved by `save`.
+        """
+        return MentionTable(pd.read_parquet(dir.joinpath("documents.parquet")),
+                            pd.read_parquet(dir.joinpath("mentions.parquet")))
+
+    def save(self, dir: Path) -> None:
+        """
+        Save the table as two Parquet files. Repeated strings are stored as dictionaries.
+        """
+        dir.mkdir(parents=True, exist_ok=True)
+        self.documents.to_parquet(dir.joinpath("documents.parquet"), index=False)
+        self.mentions.to_parquet(dir.joinpath("mentions.parquet"), index=False)
+
+    def count(self, by: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        Count the mentions of each country.
+
+        -- PARAMETERS --
+        by: The keys mentions are grouped by. The default is to count all mentions.
+
+        -- RETURNS --
+        A dataframe with the key columns, a "country" column and a "count" column,
+        sorted by keys and the counts in descending order.
+        """
+        data = self.mentions[["doc_id", "country", "count"]]
+        if len(by) > 0:
+            data = data.merge(self._keys(by), on="doc_id")
+        res = data.groupby([*by, "country"], observed=True, sort=False)["count"].sum().reset_index()
+        return res.sort_values([*by, "count"], ascending=[True] * len(by) + [False], ignore_index=True)
+
+    def relations(self, by: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        Count diplomatic relations like `DiplomacyCounter`. Two countries are related once
+        if they are mentioned in the same sentence cluster, and clusters never cross documents.
+
+        -- PARAMETERS --
+        by: The keys relations are grouped by. The default is to count all relations.
+
+        -- RETURNS --
+        A dataframe with the key columns, "country", "relation" and "count" columns,
+        sorted by keys and the counts in descending order.
+        """
+        data = self.mentions[["doc_id", "cluster", "country"]]
+        pairs = data.merge(data.rename(columns={"country": "relation"}), on=["doc_id", "cluster"])
+        pairs = pairs[pairs["country"].astype(str) != pairs["relation"].astype(str)]
+        if len(by) > 0:
+            pairs = pairs.merge(self._keys(by), on="doc_id")
+        res = pairs.groupby([*by, "country", "relation"], observed=True, sort=False).size()
+        res = res.rename("count").reset_index()
+        return res.sort_values([*by, "count"], ascending=[True] * len(by) + [False], ignore_index=True)
+
+    def _keys(self, by: Sequence[str]) -> pd.DataFrame:
+        """
+        Get the keys of each document. Periods are derived from dates.
+        """
+        res = pd.DataFrame({"doc_id": self.documents["doc_id"]})
+        for key in by:
+            if key in GRANULARITIES:
+                res[key] = self.documents["date"].dt.strftime(GRANULARITIES[key])
+            elif key in self._COLUMNS:
+                res[key] = self.documents[key]
+            else:
+                raise ValueError(f"Unknown key: {key}")
+        return res
+
+
+class MentionExtractor:
+    """
+    Extract country mentions from statements document by document in a process pool,
+    so sentence clusters never cross documents and each mention keeps the document it comes from.
+    """
+    def __init__(self, countries: Container, engine: Engine, processes: int | None = None,
+                 batch_size: int = 10_000, cluster: int | None = None, metrics: Metrics | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        engine: An engine used to extract nouns in each worker. Its own parallelism should be disabled.
+        processes: The number of worker processes. `None` means the number of CPUs.
+        batch_size: The maximum number of documents handled by a worker at once.
+        cluster: The number of sentences in a cluster. The default is the one of `Director`.
+        metrics: A collection of the numbers of documents and mentions.
+        """
+        assert processes is None or processes > 0
+        assert batch_size > 0
+        self._countries: Container = countries
+        self._engine: Engine = engine
+        self._processes: int | None = processes
+        self._batch_size: int = batch_size
+        self._cluster: int | None = cluster
+        self._metrics: Metrics = metrics if metrics is not None else Metrics()
+
+    def handle(self, documents: Iterable[pd.DataFrame]) -> MentionTable:
+        """
+        Extract mentions from documents.
+
+        -- PARAMETERS --
+        documents: Dataframes returned by `number_documents`.
+        """
+        def batches() -> Iterator[pd.DataFrame]:
+            for data in documents:
+                docs.append(data.drop(columns="content"))
+                self._metrics.count("analyze.documents", len(data))
+                for begin in range(0, len(data), self._batch_size):
+                    yield data.iloc[begin:begin + self._batch_size][["doc_id", "content"]]
+
+        docs: list[pd.DataFrame] = []
+        mentions: list[pd.DataFrame] = []
+        # Only a few batches per worker are submitted at a time, so the corpus is never held in memory at once.
+        window = 2 * (self._processes or os.cpu_count() or 1)
+        pending: deque[Future] = deque()
+        with ProcessPoolExecutor(max_workers=self._processes, initializer=_init_worker,
+                                 initargs=(self._countries, self._engine, self._cluster)) as executor:
+            for batch in batches():
+                if len(pending) >= window:
+                    mentions.append(pending.popleft().result())
+                pending.append(executor.submit(_extract, batch))
+            mentions.extend(future.result() for future in pending)
+
+        documents = pd.concat(docs, ignore_index=True) if len(docs) > 0 else \
+            pd.DataFrame(columns=["doc_id", "source", "speaker", "date"])
+        mentions = pd.concat(mentions, ignore_index=True) if len(mentions) > 0 else _mentions([], [], [])
+        self._metrics.count("analyze.document_mentions", int(mentions["count"].sum()))
+        return MentionTable(documents.astype({"source": "category", "speaker": "category"}),
+                            mentions.astype({"country": "category"}))
+
+
+_worker_countries: Container = None
+
+_worker_director: Director = None
+
+
+def _init_worker(countries: Container, engine: Engine, cluster: int | None) -> None:
+    """
+    Initialize a worker process of `MentionExtractor`.
+    """
+    global _worker_countries, _worker_director
+    _worker_countries = countries
+    _worker_director = Director(Path(), [], engine, cluster=cluster)
+
+
+def _extract(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extract the mentions of documents in a worker process of `MentionExtractor`.
+    """
+    docs, clusters, countries = [], [], []
+    current, cluster = None, 0
+    for nouns, doc in _worker_director.extract_texts(zip(data["content"], data["doc_id"].tolist())):
+        # Clusters are numbered from zero in each document.
+        cluster = cluster + 1 if doc == current else 0
+        current = doc
+        for word in nouns:
+            name = _worker_countries.main_name(word)
+            if name:
+                docs.append(doc)
+                clusters.append(cluster)
+                countries.append(name)
+    return _mentions(docs, clusters, countries)
+
+
+def _mentions(docs: list[int], clusters: list[int], countries: list[str]) -> pd.DataFrame:
+    """
+    Count the mentions of each country in each cluster.
+    """
+    data = pd.DataFrame({"doc_id": pd.Series(docs, dtype="int64"), "cluster": pd.Series(clusters, dtype="int32"),
+                         "country": pd.Series(countries, dtype="object")})
+    return data.groupby(["doc_id", "cluster", "country"], sort=False).size().rename("count").astype("int32") \
+        .reset_index()
+
+
+def main() -> None:
+    data_dir = Path(__file__).parent.parent.joinpath("data")
+    parser = argparse.ArgumentParser(description="Count the mentions of countries by their documents.")
+    parser.add_argument("--by", nargs="*", choices=MentionTable.keys(), default=[],
+                        help="The keys mentions are grouped by. The default is to count all mentions.")
+    parser.add_argument("--relations", action="store_true", help="Count diplomatic relations instead of mentions.")
+    parser.add_argument("--top", type=int, default=None, help="Only keep the top countries of each group.")
+    parser.add_argument("--dir", type=Path, default=data_dir.joinpath("document"),
+                        help="The directory of the mention table.")
+    parser.add_argument("--out", type=Path, default=None, help="A CSV file to save results instead of printing them.")
+    args = parser.parse_args()
+
+    table = MentionTable.load(args.dir)
+    res = table.relations(args.by) if args.relations else table.count(args.by)
+    if args.top is not None:
+        res = res.groupby(args.by, observed=True, sort=False).head(args.top) if len(args.by) > 0 \
+            else res.head(args.top)
+    if args.out is not None:
+        res.to_csv(args.out, index=False)
+    else:
+        print(res.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
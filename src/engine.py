@@ -0,0 +1,167 @@
+from collections.abc import Iterable, Iterator
+from typing import TypeVar
+
+from country import Matcher
+
+
+T = TypeVar("T")
+
+
+class Engine:
+    """
+    Extract nouns or country names from sentence clusters.
+    """
+    # The number of noun chunks parsed so far. Engines not parsing noun chunks leave it zero.
+    chunks: int = 0
+
+    def extract(self, clusters: Iterable[tuple[str, T]]) -> Iterator[tuple[list[str], T]]:
+        """
+        Extract nouns from each sentence cluster.
+
+        -- PARAMETERS --
+        clusters: Sentence clusters and their contexts, such as periods. A context is returned along with its nouns.
+        """
+        assert False
+
+    @property
+    def version(self) -> str:
+        """
+        Get a string identifying the engine and its resources, such as the spaCy model and the country list.
+        The nouns extracted by engines with different versions might be different.
+        """
+        assert False
+
+
+class NounChunkEngine(Engine):
+    """
+    Extract noun chunks by the full spaCy pipeline, which needs the tagger and parser.
+    """
+    def __init__(self, model: str = "en_core_web_sm", batch_size: int = 64, n_process: int = 1,
+                 matcher: Matcher | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        model: The name of a spaCy model.
+        batch_size: The number of sentence clusters parsed by spaCy in a batch.
+        n_process: The number of processes used by spaCy to parse batches.
+        matcher: A country matcher. If it is provided, only the countries found in noun chunks are extracted.
+        """
+        assert batch_size > 0 and n_process > 0
+        self._model: str = model
+        self._batch_size: int = batch_size
+        self._n_process: int = n_process
+        self._matcher: Matcher | None = matcher
+        self._nlp = None
+
+    def extract(self, clusters: Iterable[tuple[str, T]]) -> Iterator[tuple[list[str], T]]:
+        if self._nlp is None:
+            import spacy
+            self._nlp = spacy.load(self._model)
+        docs = self._nlp.pipe(clusters, as_tuples=True, batch_size=self._batch_size, n_process=self._n_process)
+        for doc, context in docs:
+            chunks = list(doc.noun_chunks)
+            self.chunks += len(chunks)
+            if self._matcher is None:
+                yield [i.text for i in chunks], context
+            else:
+                yield [name for i in chunks for name in self._matcher.names(i.text)], context
+
+    @property
+    def version(self) -> str:
+        version = f"noun-chunk/{self._model}/{_model_version(self._model)}"
+        return version if self._matcher is None else f"{version}/{self._matcher.version}"
+
+
+class TokenEngine(Engine):
+    """
+    Tokenize sentence clusters by spaCy without any trained component, and only keep the country names
+    found by a matcher that are aligned with tokens.
+    """
+    # The tokenizer does not belong to the pipeline, so it is always loaded.
+    _EXCLUDED: list[str] = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+    def __init__(self, matcher: Matcher, model: str = "en_core_web_sm", batch_size: int = 256,
+                 n_process: int = 1) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        matcher: A country matcher.
+        model: The name of a spaCy model. Only its tokenizer is used.
+        batch_size: The number of sentence clusters tokenized by spaCy in a batch.
+        n_process: The number of processes used by spaCy to tokenize batches.
+        """
+        assert batch_size > 0 and n_process > 0
+        self._matcher: Matcher = matcher
+        self._model: str = model
+        self._batch_size: int = batch_size
+        self._n_process: int = n_process
+        self._nlp = None
+
+    def extract(self, clusters: Iterable[tuple[str, T]]) -> Iterator[tuple[list[str], T]]:
+        if self._nlp is None:
+            import spacy
+            self._nlp = spacy.load(self._model, exclude=self._EXCLUDED)
+        docs = self._nlp.pipe(clusters, as_tuples=True, batch_size=self._batch_size, n_process=self._n_process)
+        for doc, context in docs:
+            yield [self._matcher.name(id) for begin, end, id in self._matcher.spans(doc.text)
+                   if doc.char_span(begin, end) is not None], context
+
+    @property
+    def version(self) -> str:
+        return f"token/{self._model}/{_model_version(self._model)}/{self._matcher.version}"
+
+
+class GazetteerEngine(Engine):
+    """
+    Find country names by a matcher only. spaCy is not used at all.
+    """
+    def __init__(self, matcher: Matcher) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        matcher: A country matcher.
+        """
+        self._matcher: Matcher = matcher
+
+    def extract(self, clusters: Iterable[tuple[str, T]]) -> Iterator[tuple[list[str], T]]:
+        for cluster, context in clusters:
+            yield self._matcher.names(cluster), context
+
+    @property
+    def version(self) -> str:
+        return f"gazetteer/{self._matcher.version}"
+
+
+def _model_version(model: str) -> str:
+    """
+    Get the version of an installed spaCy model without loading it.
+    """
+    import spacy
+
+    return f"{spacy.__version__}/{spacy.util.get_package_version(model)}"
+
+
+ENGINES: list[str] = ["noun-chunk", "token", "gazetteer"]
+
+
+def create(name: str, matcher: Matcher, batch_size: int = 64, n_process: int = 1) -> Engine:
+    """
+    Create an engine by its name.
+
+    -- PARAMETERS --
+    name: One of `ENGINES`.
+    matcher: A country matcher.
+    batch_size: The number of sentence clusters handled by spaCy in a batch.
+    n_process: The number of processes used by spaCy.
+    """
+    if name == "noun-chunk":
+        return NounChunkEngine(batch_size=batch_size, n_process=n_process, matcher=matcher)
+    elif name == "token":
+        return TokenEngine(matcher, batch_size=batch_size, n_process=n_process)
+    elif name == "gazetteer":
+        return GazetteerEngine(matcher)
+    else:
+        raise ValueError(f"Unknown engine: {name}")
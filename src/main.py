@@ -1,78 +1,364 @@
-import json
+import argparse
+import datetime as dt
+import functools
+import os
 import logging
+import sys
 from pathlib import Path
 
-from country import Container as CountryContainer
-from clean import PathTuple as CleanerPathTuple, Standard, Segment
-from counter import Director, NormalCounter, DiplomacyCounter, Counter
-from visualize.loader import PathTuple as LoaderPathTuple, NormalLoader, DiplomacyLoader
-from visualize.graph import BarChart, Sankey, FlowMap
+from config import Config
+from metrics import Metrics
 
 
 JSON_INDENT = 4
 
+# Whether to write counts as JSON Lines without indentation, one line per country or period,
+# so they are streamed to disk and a single country or period can be loaded alone.
+COMPACT_OUTPUT = False
+
+# Whether to read original datasets by pyarrow, which only loads the needed rows and columns.
+CSV_ARROW = True
+
+# The maximum number of rows cleaned at once. `None` means whole datasets are loaded and sorted by date.
+CSV_CHUNK_SIZE = None
+
+# Whether to also store standard datasets as Parquet files partitioned by source and year.
+# In the chunked mode, annual files are then segmented from the store one partition at a time and sorted by date.
+PARQUET_STORE = False
+
+NLP_BATCH_SIZE = 64
+
+# The number of analysis processes. If it is 1, annual files are analyzed in this process.
+NLP_PROCESS_NUM = os.cpu_count() or 1
+
+NLP_SHARD_SIZE = 16 * 1024 * 1024
+
+# One of "noun-chunk", "token" and "gazetteer".
+NLP_ENGINE = "noun-chunk"
+
+# Whether to reuse the nouns extracted from unchanged shards in previous runs.
+NLP_CACHE = True
+
+# Whether to count diplomatic relations by sparse matrices, which use less memory on large corpora.
+DIPLOMACY_MATRIX = False
+
+# The number of sentences in a sliding window whose countries are related to each other.
+# `None` means diplomatic relations are counted in non-overlapping clusters of three sentences.
+DIPLOMACY_WINDOW = None
+
+# The number of sentences between the beginnings of two sliding windows.
+DIPLOMACY_STRIDE = 1
+
+# Whether to count countries by a dense array, which is saved as a single binary file instead of JSON files.
+NORMAL_ARRAY = False
+
+NORMAL_ARRAY_FILE = "count.npz"
+
+# Whether to render charts from the top countries and relations precomputed by the analysis,
+# instead of loading all counts.
+RANKING = True
+
+RANKING_TOP = 20
+
+RANKING_FILE = "ranking.json"
+
+# The number of charts rendered at the same time. `1` means charts are rendered one after another.
+RENDER_WORKERS = os.cpu_count() or 1
+
+# Whether to render charts in processes instead of threads. Building chart options holds the GIL.
+RENDER_PROCESS = True
+
+# Whether to render charts of all speakers, and bar-charts and flow-maps of each period in subdirectories.
+RENDER_BATCH = False
+
+# Whether to save a JSON report of stage timings, processed items and the peak memory usage after each run.
+METRICS_REPORT = True
+
+# Whether to profile each stage by `cProfile`. Profiles are stored in `data/profile`.
+PROFILE_STAGES = False
+
+# Whether to also extract a table of mentions keeping their sources and documents, which is stored in `data/document`.
+# It can be counted by source, speaker or period by `document.py` without running NLP again.
+# The table is extracted by another NLP pass over the whole corpus without the shard cache,
+# which takes about as long as the uncached analysis.
+DOCUMENT_MENTIONS = False
+
+# The minimum number of seconds between two checkpoints of the analysis, which are stored in `data/checkpoint`.
+# An interrupted analysis continues from its checkpoint when the program runs with `--resume`.
+# With several processes, only the shards of `NLP_SHARD_SIZE` bytes that have finished are kept.
+# With a single process, the progress inside an annual file is also kept.
+CHECKPOINT_INTERVAL = 60
+
 data_dir = Path(__file__).parent.parent.joinpath("data")
 
-countries = CountryContainer(Path(__file__).parent.joinpath("countries.json"))
+# The date range, period granularity and speakers are loaded from this file if it exists.
+config_path = Path(__file__).parent.parent.joinpath("config.json")
+
+config = Config.load(config_path) if config_path.exists() else Config()
+
+metrics = Metrics(data_dir.joinpath("profile") if PROFILE_STAGES else None)
+
+# Whether to continue the analysis from its checkpoints. It is set by `--resume`.
+resume = False
+
+# Heavy dependencies, such as pandas, spaCy, NLTK and pyecharts, are imported by each stage when it runs,
+# so a stage only pays for its own dependencies.
 
 
-def clean() -> None:
-    paths = CleanerPathTuple()
+@functools.cache
+def load_countries():
+    """
+    Load the country list when it is first needed.
+    """
+    from country import Container
+    return Container(Path(__file__).parent.joinpath("countries.json"))
+
+
+def sentence_cluster() -> int | None:
+    """
+    Get the number of sentences whose nouns are sent to counters at once. `None` means the default of `Director`.
+    """
+    # Windowed counters need single sentences.
+    return 1 if DIPLOMACY_WINDOW is not None else None
+
+
+def create_counters() -> tuple:
+    """
+    Create an empty normal counter and its diplomacy counter as configured.
+    """
+    from counter import NormalCounter, ArrayNormalCounter, DiplomacyCounter, MatrixDiplomacyCounter, \
+        WindowDiplomacyCounter
+
+    countries = load_countries()
+    if NORMAL_ARRAY:
+        normal = ArrayNormalCounter(countries, config.periods())
+    else:
+        normal = NormalCounter(countries, config.periods())
+    if DIPLOMACY_WINDOW is not None:
+        diplomacy = WindowDiplomacyCounter(countries, normal, config.periods(), DIPLOMACY_WINDOW, DIPLOMACY_STRIDE)
+    elif DIPLOMACY_MATRIX:
+        diplomacy = MatrixDiplomacyCounter(countries, normal, config.periods())
+    else:
+        diplomacy = DiplomacyCounter(countries, normal, config.periods())
+    return normal, diplomacy
+
+
+def save_counts(speaker: str, normal, diplomacy) -> None:
+    """
+    Write a speaker's counts and ranking in the configured formats.
+    """
+    from counter import write_counts
+    from ranking import Ranking
+
+    count_dir = config.speaker_dir(data_dir.joinpath("count"), speaker)
+    if NORMAL_ARRAY:
+        count_dir.joinpath("normal").mkdir(parents=True, exist_ok=True)
+        normal.save(count_dir.joinpath("normal", NORMAL_ARRAY_FILE))
+    else:
+        write_counts(normal, count_dir.joinpath("normal"), COMPACT_OUTPUT, JSON_INDENT)
+    write_counts(diplomacy, count_dir.joinpath("diplomacy"), COMPACT_OUTPUT, JSON_INDENT)
+
+    ranking = Ranking(RANKING_TOP, [load_countries().main_name("United States")])
+    ranking.handle(normal, diplomacy)
+    ranking.save(count_dir.joinpath(RANKING_FILE))
+
+
+def load_counts(speaker: str) -> tuple:
+    """
+    Load a speaker's counts written by `save_counts` into new counters.
+    A `FileNotFoundError` is raised if they have not been written in the configured formats.
+    """
+    from counter import ArrayNormalCounter, read_counts
+
+    count_dir = config.speaker_dir(data_dir.joinpath("count"), speaker)
+    normal, diplomacy = create_counters()
+    if NORMAL_ARRAY:
+        path = count_dir.joinpath("normal", NORMAL_ARRAY_FILE)
+        if not path.exists():
+            raise FileNotFoundError(f"No counts have been written to {path}.")
+        normal.merge(ArrayNormalCounter.load(path, load_countries()))
+    else:
+        read_counts(normal, count_dir.joinpath("normal"), COMPACT_OUTPUT)
+    read_counts(diplomacy, count_dir.joinpath("diplomacy"), COMPACT_OUTPUT)
+    return normal, diplomacy
+
+
+def clean(separate: bool = True) -> None:
+    """
+    Unify original datasets, and separate them into annual files if `separate` is true.
+    Datasets are passed to the segmentation in memory, without reading standard datasets again.
+    The segmentation is timed as a "segment" stage inside the "clean" stage.
+    """
+    from clean import PathTuple, Standard, Segment
+    from store import Store
+
+    paths = PathTuple()
     paths.trump_tweet = data_dir.joinpath("origin", "donald_trump_tweet.csv")
     paths.president_speech = data_dir.joinpath("origin", "presidential_speech.csv")
     paths.state_of_union_address = data_dir.joinpath("origin", "state_of_the_union_address.csv")
 
-    data = Standard(paths, data_dir.joinpath("clean")).handle()
-    Segment(data_dir.joinpath("segment")).handle_dataframe(data)
+    store = Store(data_dir.joinpath("store")) if PARQUET_STORE else None
+    standard = Standard(paths, data_dir.joinpath("clean"), arrow=CSV_ARROW, store=store, config=config,
+                        metrics=metrics)
+    if not separate:
+        if CSV_CHUNK_SIZE is None:
+            standard.handle()
+        else:
+            for _ in standard.stream(CSV_CHUNK_SIZE):
+                pass
+        return
+
+    segment = Segment(data_dir.joinpath("segment"), config, metrics)
+    if CSV_CHUNK_SIZE is None:
+        data = standard.handle()
+        with metrics.stage("segment"):
+            segment.handle_dataframe(data)
+    elif store is None:
+        # Chunks are cleaned while they are segmented, so the segmentation also includes their cleaning.
+        with metrics.stage("segment"):
+            segment.handle_chunks(standard.stream(CSV_CHUNK_SIZE))
+    else:
+        for _ in standard.stream(CSV_CHUNK_SIZE):
+            pass
+        with metrics.stage("segment"):
+            segment.handle_store(store)
+
+
+def segment() -> None:
+    """
+    Separate standard datasets written by `clean` into annual files.
+    """
+    from clean import PathTuple, Segment
+    from store import Store
+
+    handler = Segment(data_dir.joinpath("segment"), config, metrics)
+    if PARQUET_STORE:
+        handler.handle_store(Store(data_dir.joinpath("store")))
+        return
+    paths = PathTuple()
+    paths.trump_tweet = data_dir.joinpath("clean", "donald_trump_tweet.csv")
+    paths.president_speech = data_dir.joinpath("clean", "presidential_speech.csv")
+    paths.state_of_union_address = data_dir.joinpath("clean", "state_of_the_union_address.csv")
+    handler.handle_csv(paths, CSV_CHUNK_SIZE)
 
 
 def analyze() -> None:
-    def write_json(counter: Counter, out_dir: Path) -> None:
-        if not out_dir.exists():
-            out_dir.mkdir(parents=True)
-        with out_dir.joinpath("total_count.json").open("w", encoding="utf-8") as file:
-            file.write(json.dumps(counter.total, indent=JSON_INDENT))
-        with out_dir.joinpath("annual_count.json").open("w", encoding="utf-8") as file:
-            file.write(json.dumps(counter.annual, indent=JSON_INDENT))
+    from cache import Cache
+    from checkpoint import Checkpoint
+    from country import Matcher
+    from counter import Director, ParallelDirector
+    from engine import create as create_engine
+
+    countries = load_countries()
+    engine = create_engine(NLP_ENGINE, Matcher(countries), batch_size=NLP_BATCH_SIZE)
+    cache = Cache(data_dir.joinpath("cache", "nlp.sqlite3")) if NLP_CACHE else None
+    for speaker in config.speakers:
+        normal, diplomacy = create_counters()
+        checkpoint_dir = config.speaker_dir(data_dir.joinpath("checkpoint"), speaker)
+        checkpoint = Checkpoint(checkpoint_dir.joinpath("analyze.pickle"), CHECKPOINT_INTERVAL, resume)
+        in_dir = config.speaker_dir(data_dir.joinpath("segment"), speaker)
+        if NLP_PROCESS_NUM > 1:
+            director = ParallelDirector(in_dir, [diplomacy], engine, processes=NLP_PROCESS_NUM,
+                                        shard_size=NLP_SHARD_SIZE, cache=cache, metrics=metrics,
+                                        checkpoint=checkpoint, cluster=sentence_cluster())
+        else:
+            director = Director(in_dir, [diplomacy], engine, cache=cache, metrics=metrics, checkpoint=checkpoint,
+                                cluster=sentence_cluster())
+        director.handle()
+        metrics.count("analyze.mentions", sum(normal.total.values()))
+        save_counts(speaker, normal, diplomacy)
+        checkpoint.remove()
 
-    normal = NormalCounter(countries)
-    diplomacy = DiplomacyCounter(countries, normal)
-    Director(data_dir.joinpath("segment"), [diplomacy]).handle()
+    if DOCUMENT_MENTIONS:
+        from clean import SOURCES, read_csv_chunks
+        from document import MentionExtractor, number_documents
+        from store import Store
 
-    write_json(normal, data_dir.joinpath("count", "normal"))
-    write_json(diplomacy, data_dir.joinpath("count", "diplomacy"))
+        if PARQUET_STORE:
+            store = Store(data_dir.joinpath("store"))
+            chunks = ((source, store.read([source], [year])) for year in store.years() for source in SOURCES)
+        else:
+            names = ["donald_trump_tweet.csv", "presidential_speech.csv", "state_of_the_union_address.csv"]
+            chunks = ((source, data) for source, name in zip(SOURCES, names)
+                      for data in read_csv_chunks(data_dir.joinpath("clean", name), ["date", "content", "speaker"],
+                                                  chunk_size=CSV_CHUNK_SIZE))
+        extractor = MentionExtractor(countries, engine, NLP_PROCESS_NUM, cluster=sentence_cluster(), metrics=metrics)
+        extractor.handle(number_documents(chunks)).save(data_dir.joinpath("document"))
 
 
 def visualize() -> None:
-    paths = LoaderPathTuple()
-    paths.total = data_dir.joinpath("count", "normal", "total_count.json")
-    paths.annual = data_dir.joinpath("count", "normal", "annual_count.json")
-    normal = NormalLoader()
-    normal.load(paths)
-
-    paths = LoaderPathTuple()
-    paths.total = data_dir.joinpath("count", "diplomacy", "total_count.json")
-    paths.annual = data_dir.joinpath("count", "diplomacy", "annual_count.json")
-    diplomacy = DiplomacyLoader()
-    diplomacy.load(paths)
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from visualize.loader import PathTuple as LoaderPathTuple, NormalLoader, LongDiplomacyLoader, RankingLoader
+    from visualize.graph import Graph, BarChart, Sankey, FlowMap
 
-    usa = countries.main_name("United States")
+    def load(speaker: str) -> tuple:
+        count_dir = config.speaker_dir(data_dir.joinpath("count"), speaker)
+        # Counts written before rankings were introduced have no ranking, so all counts are loaded instead.
+        if RANKING and count_dir.joinpath(RANKING_FILE).exists():
+            loader = RankingLoader()
+            loader.load(count_dir.joinpath(RANKING_FILE))
+            return loader, loader
 
-    def barchart() -> None:
-        chart = BarChart(usa, normal)
-        chart.render(data_dir.joinpath("visualize", "bar-chart.html"))
+        suffix = ".jsonl" if COMPACT_OUTPUT else ".json"
+        paths = LoaderPathTuple()
+        paths.total = count_dir.joinpath("normal", "total_count" + suffix)
+        paths.annual = count_dir.joinpath("normal", "annual_count" + suffix)
+        normal = NormalLoader()
+        if NORMAL_ARRAY:
+            normal.load_array(count_dir.joinpath("normal", NORMAL_ARRAY_FILE))
+        elif COMPACT_OUTPUT:
+            normal.load_compact(paths)
+        else:
+            normal.load(paths)
 
-    def sankey() -> None:
-        chart = Sankey(usa, normal, diplomacy)
-        chart.render(data_dir.joinpath("visualize", "sankey-diagram.html"))
+        paths = LoaderPathTuple()
+        paths.total = count_dir.joinpath("diplomacy", "total_count" + suffix)
+        paths.annual = count_dir.joinpath("diplomacy", "annual_count" + suffix)
+        diplomacy = LongDiplomacyLoader()
+        if COMPACT_OUTPUT:
+            # The sankey diagram only needs the total count.
+            diplomacy.load_compact(paths, periods=[])
+        else:
+            diplomacy.load(paths)
+        return normal, diplomacy
 
-    def flowmap() -> None:
-        chart = FlowMap(usa, countries, normal)
-        chart.render(data_dir.joinpath("visualize", "flow-map.html"))
+    countries = load_countries()
+    usa = countries.main_name("United States")
+    charts: list[tuple[Graph, Path]] = []
+    for speaker in config.speakers if RENDER_BATCH else config.speakers[:1]:
+        normal, diplomacy = load(speaker)
+        out_dir = config.speaker_dir(data_dir.joinpath("visualize"), speaker)
+        charts.append((BarChart(usa, normal, speaker=speaker), out_dir.joinpath("bar-chart.html")))
+        charts.append((Sankey(usa, normal, diplomacy, speaker=speaker), out_dir.joinpath("sankey-diagram.html")))
+        charts.append((FlowMap(usa, countries, normal, speaker=speaker), out_dir.joinpath("flow-map.html")))
+        if RENDER_BATCH:
+            for period in normal.annual.keys():
+                charts.append((BarChart(usa, normal, speaker=speaker, period=period),
+                               out_dir.joinpath(period, "bar-chart.html")))
+                charts.append((FlowMap(usa, countries, normal, speaker=speaker, period=period),
+                               out_dir.joinpath(period, "flow-map.html")))
+
+    metrics.count("render.charts", len(charts))
+    if RENDER_WORKERS > 1:
+        pool = ProcessPoolExecutor if RENDER_PROCESS else ThreadPoolExecutor
+        with pool(max_workers=RENDER_WORKERS) as executor:
+            for future in [executor.submit(chart.render, path) for chart, path in charts]:
+                future.result()
+    else:
+        for chart, path in charts:
+            chart.render(path)
 
-    barchart()
-    sankey()
-    flowmap()
+
+# The stages run by each subcommand, in order, along with their names and the messages printed after they finish.
+STAGES = {
+    "clean": [("clean", functools.partial(clean, separate=False), "The clean has finished.")],
+    "segment": [("segment", segment, "The segmentation has finished.")],
+    "analyze": [("analyze", analyze, "The analysis has finished.")],
+    "render": [("render", visualize, "The visualize has finished.")],
+    "all": [("clean", clean, "The clean has finished."),
+            ("analyze", analyze, "The analysis has finished."),
+            ("render", visualize, "The visualize has finished.")],
+}
 
 
 if __name__ == "__main__":
@@ -80,15 +366,28 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     logger = logging.getLogger(__name__)
 
-    try:
-        clean()
-        print("[*] The clean has finished.")
+    parser = argparse.ArgumentParser(description="Count the countries mentioned by presidents.")
+    parser.add_argument("command", nargs="?", choices=STAGES.keys(), default="all",
+                        help="The stage to run. \"clean\" only writes standard datasets, which \"segment\" separates "
+                             "into annual files. \"all\" runs every stage. The default is \"all\".")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted analysis from its checkpoints instead of starting over.")
+    args = parser.parse_args()
+    resume = args.resume
 
-        analyze()
-        print("[*] The analysis has finished.")
-
-        visualize()
-        print("[*] The visualize has finished.")
+    try:
+        for name, stage, message in STAGES[args.command]:
+            with metrics.stage(name):
+                stage()
+            print(f"[*] {message}")
 
     except BaseException as err:
         logger.exception(err)
+        # A non-zero status lets schedulers detect the failed stage.
+        sys.exit(1)
+
+    finally:
+        if METRICS_REPORT:
+            report = data_dir.joinpath("report", f"run-{dt.datetime.now():%Y%m%d-%H%M%S}.json")
+            metrics.save(report)
+            print(f"[*] The run report has been saved to {report}.")
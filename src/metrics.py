@@ -0,0 +1,119 @@
+import contextlib
+import cProfile
+import datetime as dt
+import json
+import platform
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def max_rss() -> int | None:
+    """
+    Get the maximum resident set size of the process and its finished children, in bytes.
+    `None` means it is not supported by the platform.
+    """
+    if resource is None:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # It is in kilobytes on Linux but in bytes on macOS.
+    return usage if platform.system() == "Darwin" else usage * 1024
+
+
+class Metrics:
+    """
+    Collect the counts and stage timings of a run, such as the numbers of rows, sentences and noun chunks.
+    Counts are named like "<stage>.<item>", such as "clean.rows" and "analyze.sentences".
+    Stages can be nested, and the time of an outer stage includes the inner ones.
+    """
+    def __init__(self, profile_dir: Path | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        profile_dir: A directory used to store a `cProfile` file for each stage. `None` means stages are not profiled.
+        """
+        self._profile_dir: Path | None = profile_dir
+        self._counts: dict[str, int] = {}
+        self._stages: dict[str, dict] = {}
+        self._profiling: bool = False
+        self._begin: dt.datetime = dt.datetime.now(dt.timezone.utc)
+
+    def count(self, name: str, num: int = 1) -> None:
+        """
+        Increase a count.
+        """
+        self._counts[name] = self._counts.get(name, 0) + num
+
+    def merge(self, other: "Metrics") -> None:
+        """
+        Add the counts of another collection, such as one from a worker process.
+        """
+        for name, num in other._counts.items():
+            self.count(name, num)
+
+    @property
+    def counts(self) -> dict[str, int]:
+        return dict(self._counts)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a stage in a `with` block, and profile it if there is a profile directory.
+        Only one profiler can be active, so a nested stage is only profiled as a part of the outer one.
+        """
+        profiler = None
+        if self._profile_dir is not None and not self._profiling:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            self._profiling = True
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - begin
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                self._profile_dir.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self._profile_dir.joinpath(f"{name}.prof"))
+            # A stage run several times is timed as a whole.
+            seconds += self._stages.get(name, {}).get("seconds", 0)
+            self._stages[name] = {"seconds": seconds, "max_rss": max_rss()}
+
+    def report(self) -> dict:
+        """
+        Get a report of all stages, along with the throughput of each count in its stage.
+        """
+        stages = {}
+        for name, stage in self._stages.items():
+            counts = {key.split(".", 1)[1]: num for key, num in self._counts.items() if key.split(".", 1)[0] == name}
+            stages[name] = {
+                **stage,
+                "counts": counts,
+                "per_second": {key: num / stage["seconds"] for key, num in counts.items() if stage["seconds"] > 0},
+            }
+            lookups = counts.get("cache_hits", 0) + counts.get("cache_misses", 0)
+            if lookups > 0:
+                stages[name]["cache_hit_ratio"] = counts.get("cache_hits", 0) / lookups
+        return {
+            "begin": self._begin.isoformat(),
+            "python": platform.python_version(),
+            "max_rss": max_rss(),
+            "stages": stages,
+            "counts": self.counts,
+        }
+
+    def save(self, path: Path) -> None:
+        """
+        Save the report to a JSON file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as file:
+            json.dump(self.report(), file, indent=4)
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+from collections.abc import Sequence
+
+from counter import Counter, MatrixDiplomacyCounter
+
+
+class Ranking:
+    """
+    Precompute top countries and diplomatic relations from counters, so charts do not need all counts.
+    """
+    def __init__(self, top: int = 20, excluded: Sequence[str] = ()) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        top: The number of top countries and relations to keep.
+        excluded: The countries never ranked as top countries, such as the United States.
+            They can still be diplomatic relations.
+        """
+        assert top > 0
+        self._top: int = top
+        self._excluded: list[str] = list(excluded)
+        self._data: dict = {}
+
+    def handle(self, normal: Counter, diplomacy: Counter) -> dict:
+        """
+        Build the ranking.
+
+        -- PARAMETERS --
+        normal: A counter containing normal counts.
+        diplomacy: A counter containing diplomacy counts.
+
+        -- RETURNS --
+        total: The top countries and their counts.
+        periods: The top countries and their counts in each period.
+        series: The counts of the total top countries in each period, in the order of `total`.
+        relations: The top relations and their counts of each total top country.
+        """
+        # Array and matrix counters build their counts on each access, so each count is only read once.
+        annual = normal.annual
+        total = self._rank(normal.total)
+        countries = [country for country, _ in total]
+        relations = {}
+        if isinstance(diplomacy, MatrixDiplomacyCounter):
+            for country in countries:
+                relations[country] = diplomacy.top(country, self._top)
+        else:
+            diplomacy_total = diplomacy.total
+            for country in countries:
+                count = diplomacy_total.get(country)
+                relations[country] = count.most_common(self._top) if count else []
+        self._data = {
+            "top": self._top,
+            "excluded": self._excluded,
+            "total": total,
+            "periods": {period: self._rank(count) for period, count in annual.items()},
+            "series": {period: [count.get(country, 0) for country in countries] for period, count in annual.items()},
+            "relations": relations,
+        }
+        return self._data
+
+    def save(self, path: Path) -> None:
+        """
+        Save the ranking to a JSON file.
+        """
+        with path.open("w", encoding="utf-8") as file:
+            json.dump(self._data, file)
+
+    def _rank(self, count: dict[str, int]) -> list[tuple[str, int]]:
+        """
+        Get the top countries in a count, except the excluded ones.
+        """
+        count = sorted(((country, num) for country, num in count.items() if country not in self._excluded),
+                       key=lambda i: i[1], reverse=True)
+        return count[:self._top]
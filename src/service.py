@@ -0,0 +1,218 @@
+"""
+Count countries in a resident process, so the NLP model and the country list are only loaded once.
+
+Run it in the `src` directory:
+
+    python service.py [--host HOST] [--port PORT | --unix PATH] [--engine NAME] [--processes N]
+
+Requests are HTTP `POST`s with JSON bodies:
+
+    POST /texts  {"texts": ["...", ...], "period": "2020"}
+    POST /shards {"paths": ["../data/segment/2020.txt", ...], "shard_size": 16777216}
+
+Both return the normal and diplomacy counts in the same structure as the count files:
+
+    {"normal": {"total": {...}, "annual": {...}}, "diplomacy": {"total": {...}, "annual": {...}}}
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from country import Container, Matcher
+from counter import Director, NormalCounter, DiplomacyCounter, Shard, split_file
+from engine import ENGINES, Engine, create
+
+
+class Service:
+    """
+    Serve counting requests over HTTP, by a pool of worker processes which keep an engine loaded.
+    """
+    _REASONS: dict[int, str] = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                                500: "Internal Server Error"}
+
+    def __init__(self, countries: Container, engine: Engine, processes: int | None = None,
+                 shard_size: int | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        countries: A country container.
+        engine: An engine used to extract nouns in each worker. Its own parallelism should be disabled.
+        processes: The number of worker processes. `None` means the number of CPUs.
+        shard_size: The default maximum number of bytes counted by a worker at once. `None` means a whole file.
+        """
+        assert processes is None or processes > 0
+        self._countries: Container = countries
+        self._engine: Engine = engine
+        self._processes: int | None = processes
+        self._shard_size: int | None = shard_size
+        self._executor: ProcessPoolExecutor = None
+
+    def run(self, host: str = "127.0.0.1", port: int = 8765, unix: Path | None = None) -> None:
+        """
+        Start the service and wait until it is interrupted.
+
+        -- PARAMETERS --
+        host: The host listened on.
+        port: The port listened on.
+        unix: The path of a Unix socket listened on instead of a TCP port.
+        """
+        asyncio.run(self._serve(host, port, unix))
+
+    async def _serve(self, host: str, port: int, unix: Path | None) -> None:
+        with ProcessPoolExecutor(max_workers=self._processes, initializer=_init_worker,
+                                 initargs=(self._countries, self._engine)) as executor:
+            self._executor = executor
+            if unix is not None:
+                server = await asyncio.start_unix_server(self._handle_connection, path=str(unix))
+            else:
+                server = await asyncio.start_server(self._handle_connection, host, port)
+            async with server:
+                await server.serve_forever()
+
+    async def count_texts(self, texts: list[str], period: str) -> dict:
+        """
+        Count texts of a period.
+        """
+        normal, diplomacy = await asyncio.get_running_loop().run_in_executor(
+            self._executor, _count_texts, texts, period)
+        return _to_dict(normal, diplomacy)
+
+    async def count_shards(self, paths: list[Path], shard_size: int | None = None) -> dict:
+        """
+        Count annual files, whose names are their periods, by splitting them into shards.
+        """
+        normal = NormalCounter(self._countries, [])
+        diplomacy = DiplomacyCounter(self._countries, normal, [])
+        loop = asyncio.get_running_loop()
+        shards = [(shard.path, shard.begin, shard.end) for path in paths for shard in split_file(path, shard_size)]
+        for result in await asyncio.gather(*(loop.run_in_executor(self._executor, _count_shard, *i) for i in shards)):
+            diplomacy.merge(result[1])
+        return _to_dict(normal, diplomacy)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Handle HTTP requests from a connection until it is closed.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, value = line.decode("latin-1").split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, res = await self._route(method, target, body)
+                data = json.dumps(res).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {self._REASONS[status]}\r\n"
+                              "Content-Type: application/json\r\n"
+                              f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, target: str, body: bytes) -> tuple[int, dict]:
+        """
+        Dispatch a request and get the status and the response.
+        """
+        if target not in ("/texts", "/shards"):
+            return 404, {"error": f"Unknown path: {target}"}
+        if method != "POST":
+            return 405, {"error": f"Unsupported method: {method}"}
+        try:
+            req = json.loads(body)
+            if target == "/texts":
+                if type(req["texts"]) is not list:
+                    raise TypeError("\"texts\" must be a list.")
+                return 200, await self.count_texts([str(i) for i in req["texts"]], str(req["period"]))
+            else:
+                if type(req["paths"]) is not list:
+                    raise TypeError("\"paths\" must be a list.")
+                paths = [Path(i) for i in req["paths"]]
+                for path in paths:
+                    if not path.is_file():
+                        raise ValueError(f"Not a file: {path}")
+                size = req.get("shard_size", self._shard_size)
+                if size is not None and (type(size) is not int or size <= 0):
+                    raise ValueError("\"shard_size\" must be a positive integer or null.")
+                return 200, await self.count_shards(paths, size)
+        except (ValueError, KeyError, TypeError) as err:
+            return 400, {"error": f"Invalid request: {err!r}"}
+        except Exception as err:
+            # Failures of workers or files, such as a broken process pool, are still answered.
+            logging.getLogger(__name__).exception(err)
+            return 500, {"error": f"Internal error: {err!r}"}
+
+
+_worker_countries: Container = None
+
+_worker_engine: Engine = None
+
+
+def _init_worker(countries: Container, engine: Engine) -> None:
+    """
+    Initialize a worker process of `Service` and load its engine before the first request.
+    """
+    global _worker_countries, _worker_engine
+    _worker_countries, _worker_engine = countries, engine
+    list(engine.extract([("United States.", None)]))
+
+
+def _count_texts(texts: list[str], period: str) -> tuple[NormalCounter, DiplomacyCounter]:
+    """
+    Count texts in a worker process of `Service`.
+    """
+    normal = NormalCounter(_worker_countries, [period])
+    diplomacy = DiplomacyCounter(_worker_countries, normal, [period])
+    Director(Path(), [diplomacy], _worker_engine).count_texts((text, period) for text in texts)
+    return normal, diplomacy
+
+
+def _count_shard(path: Path, begin: int, end: int | None) -> tuple[NormalCounter, DiplomacyCounter]:
+    """
+    Count a shard in a worker process of `Service`.
+    """
+    normal = NormalCounter(_worker_countries, [path.stem])
+    diplomacy = DiplomacyCounter(_worker_countries, normal, [path.stem])
+    Director(path.parent, [diplomacy], _worker_engine)._count([Shard(path, begin, end)], [diplomacy])
+    return normal, diplomacy
+
+
+def _to_dict(normal: NormalCounter, diplomacy: DiplomacyCounter) -> dict:
+    return {
+        "normal": {"total": normal.total, "annual": normal.annual},
+        "diplomacy": {"total": diplomacy.total, "annual": diplomacy.annual},
+    }
+
+
+def main() -> None:
+    src_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Serve counting requests with a loaded engine.")
+    parser.add_argument("--host", default="127.0.0.1", help="The host listened on.")
+    parser.add_argument("--port", type=int, default=8765, help="The port listened on.")
+    parser.add_argument("--unix", type=Path, default=None, help="A Unix socket listened on instead of a port.")
+    parser.add_argument("--engine", choices=ENGINES, default="noun-chunk", help="The engine extracting nouns.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="The number of workers.")
+    parser.add_argument("--shard-size", type=int, default=16 * 1024 * 1024,
+                        help="The maximum number of bytes counted by a worker at once.")
+    args = parser.parse_args()
+
+    countries = Container(src_dir.joinpath("countries.json"))
+    engine = create(args.engine, Matcher(countries))
+    Service(countries, engine, args.processes, args.shard_size).run(args.host, args.port, args.unix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import shutil
+import time
+from pathlib import Path
+from collections.abc import Sequence
+
+import pandas as pd
+
+
+class Store:
+    """
+    Store standard datasets as Parquet files partitioned by source and year, such as `source=trump_tweet/year=2017`.
+    Dates are stored as timestamps, so they are never parsed again.
+    Files are named by the time they are written, so rows are read in the order of being written.
+    """
+    def __init__(self, root: Path) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        root: The root directory of partitions.
+        """
+        self._root: Path = root
+
+    def write(self, source: str, data: pd.DataFrame, append: bool = False) -> None:
+        """
+        Write a standard dataframe indexed by date.
+
+        -- PARAMETERS --
+        source: The name of the dataset.
+        data: A dataframe with "content" and "speaker" columns.
+        append: Whether to keep the data written before. If not, the previous data of the source are removed.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if not append:
+            shutil.rmtree(self._root.joinpath(f"source={source}"), ignore_errors=True)
+        res = pd.DataFrame({"date": data.index.values, "content": data["content"].values,
+                            "speaker": data["speaker"].values, "source": source, "year": data.index.year.values})
+        table = pa.Table.from_pandas(res, preserve_index=False)
+        ds.write_dataset(table, self._root, format="parquet", partitioning=["source", "year"],
+                         partitioning_flavor="hive", existing_data_behavior="overwrite_or_ignore",
+                         basename_template=f"part-{time.time_ns():020d}-{{i}}.parquet")
+
+    def read(self, sources: Sequence[str] | None = None, years: Sequence[int] | None = None) -> pd.DataFrame:
+        """
+        Read the partitions of some sources and years as a dataframe indexed by date.
+        Files are memory-mapped and other partitions are never opened.
+
+        -- PARAMETERS --
+        sources: The names of datasets. `None` means all datasets.
+        years: Years. `None` means all years.
+        """
+        import pyarrow.dataset as ds
+        import pyarrow.fs as fs
+
+        condition = None
+        if sources is not None:
+            condition = ds.field("source").isin(list(sources))
+        if years is not None:
+            condition = ds.field("year").isin(list(years)) if condition is None \
+                else condition & ds.field("year").isin(list(years))
+        if not self._root.exists():
+            return pd.DataFrame({"content": pd.Series(dtype="string"), "speaker": pd.Series(dtype="string")},
+                                index=pd.DatetimeIndex([], name="date"))
+        dataset = ds.dataset(self._root, format="parquet", partitioning="hive",
+                             filesystem=fs.LocalFileSystem(use_mmap=True))
+        data = dataset.to_table(columns=["date", "content", "speaker"], filter=condition).to_pandas()
+        data.set_index("date", inplace=True)
+        data.sort_index(inplace=True, kind="stable")
+        return data
+
+    def years(self) -> list[int]:
+        """
+        Get all years having partitions.
+        """
+        if not self._root.exists():
+            return []
+        return sorted({int(year.name.removeprefix("year=")) for year in self._root.glob("source=*/year=*")})
@@ -0,0 +1,177 @@
+"""
+Fold newly arriving statements into persisted counts, without counting the whole corpus again.
+
+Run it in the `src` directory after `main.py` has written the counts:
+
+    python update.py [--since DATE] [--retract FILE ...]
+
+Counts are read and written in the formats configured in `main.py`, such as `COMPACT_OUTPUT` and `NORMAL_ARRAY`.
+
+Statements dated after the watermark are read from the original datasets and added to the counts.
+Retracted statements are read from standard CSV files with "date", "content" and "speaker" columns,
+such as rows copied from `data/clean`, and removed from the counts.
+The watermark is the latest date added, which is saved along with the counts.
+"""
+
+import argparse
+import copy
+import datetime as dt
+import json
+from collections.abc import Sequence
+from pathlib import Path
+
+import pandas as pd
+
+from clean import PathTuple, Standard, read_csv
+from config import Config
+from country import Matcher
+from counter import Counter, Director
+from engine import ENGINES, Engine, create
+import main as pipeline
+
+
+class Updater:
+    """
+    Add new statements of a speaker to counters, or remove retracted ones.
+    Each statement is counted by itself, so sentence clusters never cross statements.
+    """
+    def __init__(self, speaker: str, counters: Sequence[Counter], engine: Engine, config: Config,
+                 watermark: dt.date | None = None, cluster: int | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        speaker: The speaker whose statements are counted.
+        counters: A counter list, which should contain the persisted counts.
+        engine: An engine used to extract nouns.
+        config: The date range and granularity of counts.
+        watermark: The latest date that has been counted. Only later statements are added.
+        cluster: The number of sentences in a cluster, which should be the same as the one of the analysis.
+        """
+        self._speaker: str = speaker
+        self._counters: Sequence[Counter] = counters
+        self._engine: Engine = engine
+        self._config: Config = config
+        self._watermark: dt.date | None = watermark
+        self._cluster: int | None = cluster
+
+    @property
+    def watermark(self) -> dt.date | None:
+        """
+        Get the latest date that has been counted.
+        """
+        return self._watermark
+
+    def add(self, data: pd.DataFrame) -> int:
+        """
+        Count the statements after the watermark and move the watermark to the latest one.
+
+        -- PARAMETERS --
+        data: Statements with "date", "content" and "speaker" columns, or standard datasets indexed by dates.
+
+        -- RETURNS --
+        The number of statements counted.
+        """
+        data = self._select(data)
+        if self._watermark is not None:
+            data = data[data["date"] > self._watermark]
+        if len(data) > 0:
+            self._count(data, self._counters)
+            self._watermark = max(data["date"].max(), self._watermark or dt.date.min)
+        return len(data)
+
+    def retract(self, data: pd.DataFrame) -> int:
+        """
+        Remove the counts of retracted statements, which must have been counted before.
+
+        -- PARAMETERS --
+        data: Statements with "date", "content" and "speaker" columns, or standard datasets indexed by dates.
+
+        -- RETURNS --
+        The number of statements removed.
+        """
+        data = self._select(data)
+        if len(data) > 0:
+            counters = copy.deepcopy(self._counters)
+            for counter in counters:
+                counter.clear()
+            self._count(data, counters)
+            for counter, retracted in zip(self._counters, counters):
+                counter.subtract(retracted)
+        return len(data)
+
+    def _select(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Only keep the statements of the speaker in the date range, with parsed dates.
+        """
+        if "date" not in data.columns:
+            # Standard datasets are indexed by dates.
+            data = data.reset_index()
+        data = data.loc[data["speaker"] == self._speaker, ["date", "content"]].dropna()
+        data = data.assign(date=pd.to_datetime(data["date"].astype("string").str[:10]).dt.date)
+        return data[(data["date"] >= self._config.begin) & (data["date"] <= self._config.end)]
+
+    def _count(self, data: pd.DataFrame, counters: Sequence[Counter]) -> None:
+        texts = ((row.content, self._config.period(row.date)) for row in data.itertuples())
+        Director(Path(), counters, self._engine, cluster=self._cluster).count_texts(texts)
+
+
+def main() -> None:
+    # The data directory, the configuration and the formats of counts are the same as the ones of `main.py`.
+    data_dir, config = pipeline.data_dir, pipeline.config
+    watermark_path = data_dir.joinpath("count", "watermark.json")
+
+    parser = argparse.ArgumentParser(description="Fold new statements into persisted counts.")
+    parser.add_argument("--since", type=dt.date.fromisoformat, default=None,
+                        help="The latest date already counted. The default is the saved watermark.")
+    parser.add_argument("--retract", type=Path, nargs="*", default=[],
+                        help="Standard CSV files of statements to remove from the counts.")
+    parser.add_argument("--engine", choices=ENGINES, default=pipeline.NLP_ENGINE,
+                        help="The engine extracting nouns. The default is the one of `main.py`, "
+                             "which the persisted counts have been counted with.")
+    args = parser.parse_args()
+
+    watermark = args.since
+    if watermark is None and watermark_path.exists():
+        with watermark_path.open(encoding="utf-8") as file:
+            watermark = dt.date.fromisoformat(json.load(file)["date"])
+    if watermark is None:
+        parser.error("No watermark has been saved, so --since is required.")
+
+    new = pd.DataFrame(columns=["date", "content", "speaker"])
+    if watermark < config.end:
+        # Only the statements after the watermark are read from the original datasets.
+        delta = Config((watermark + dt.timedelta(days=1)).isoformat(), config.end.isoformat(), config.granularity,
+                       config.speakers, config.tweet_speaker)
+        paths = PathTuple()
+        paths.trump_tweet = data_dir.joinpath("origin", "donald_trump_tweet.csv")
+        paths.president_speech = data_dir.joinpath("origin", "presidential_speech.csv")
+        paths.state_of_union_address = data_dir.joinpath("origin", "state_of_the_union_address.csv")
+        data = Standard(paths, data_dir.joinpath("update", "clean"), arrow=pipeline.CSV_ARROW,
+                        config=delta).handle()
+        new = pd.concat([data.trump_tweet, data.president_speech, data.state_of_union_address])
+    retracted = [read_csv(path, ["date", "content", "speaker"]) for path in args.retract]
+
+    engine = create(args.engine, Matcher(pipeline.load_countries()))
+    # All persisted counts are loaded before any of them is overwritten.
+    try:
+        counts = {speaker: pipeline.load_counts(speaker) for speaker in config.speakers}
+    except FileNotFoundError as err:
+        parser.error(f"{err} Run `main.py` first.")
+
+    latest = watermark
+    for speaker, (normal, diplomacy) in counts.items():
+        updater = Updater(speaker, [diplomacy], engine, config, watermark, pipeline.sentence_cluster())
+        added = updater.add(new)
+        removed = sum(updater.retract(data) for data in retracted)
+        print(f"[*] {speaker}: {added} statements have been added and {removed} have been removed.")
+        latest = max(latest, updater.watermark)
+        pipeline.save_counts(speaker, normal, diplomacy)
+
+    watermark_path.parent.mkdir(parents=True, exist_ok=True)
+    with watermark_path.open("w", encoding="utf-8") as file:
+        json.dump({"date": latest.isoformat()}, file)
+
+
+if __name__ == "__main__":
+    main()
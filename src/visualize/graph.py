@@ -1,27 +1,52 @@
 from pathlib import Path
 
+import pandas as pd
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Geo, Sankey as PySankey
 from pyecharts.globals import ThemeType, ChartType
 
 from country import Container
-from visualize.loader import NormalLoader, DiplomacyLoader
+from visualize.loader import NormalLoader, DiplomacyLoader, LongDiplomacyLoader, RankingLoader
 
 
 class Graph:
+    def __init__(self, speaker: str = "Donald Trump", period: str | None = None) -> None:
+        """
+        The constructor.
+
+        -- PARAMETERS --
+        speaker: The speaker shown in titles.
+        period: A period label. `None` means the total count is shown.
+        """
+        self._speaker: str = speaker
+        self._period: str | None = period
+
     def render(self, filepath: Path) -> None:
         """
         Render a graph and store it.
         """
-        if not filepath.parent.exists():
-            filepath.parent.mkdir(parents=True)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+
+    def _title(self, title: str) -> str:
+        """
+        Append the speaker and the period to a title.
+        """
+        title = f"{title} by {self._speaker}"
+        return title if self._period is None else f"{title} in {self._period}"
+
+    def _total(self, loader: NormalLoader | RankingLoader) -> pd.DataFrame:
+        """
+        Get the total count, or the count in the period.
+        """
+        return loader.total if self._period is None else loader.period_total(self._period)
 
 
 class BarChart(Graph):
     """
     Render a bar-chart.
     """
-    def __init__(self, usa: str, loader: NormalLoader, top: int = 10) -> None:
+    def __init__(self, usa: str, loader: NormalLoader | RankingLoader, top: int = 10,
+                 speaker: str = "Donald Trump", period: str | None = None) -> None:
         """
         The constructor.
 
@@ -29,23 +54,26 @@ class BarChart(Graph):
         usa: The official name of the United States.
         loader: A loader containing normal counts.
         top: The number of top countries to show.
+        speaker: The speaker shown in titles.
+        period: A period label. `None` means the total count is shown and stacked by periods.
         """
         assert top > 0
-        super().__init__()
+        super().__init__(speaker, period)
         self._usa: str = usa
-        self._loader: NormalLoader = loader
+        self._loader: NormalLoader | RankingLoader = loader
         self._top: int = top
 
     def render(self, filepath: Path) -> None:
         super().render(filepath)
-        total = self._loader.total.drop(index=[self._usa], errors="ignore").head(self._top)
+        total = self._total(self._loader).drop(index=[self._usa], errors="ignore").head(self._top)
         countries = total.index.tolist()
 
         bar = Bar(init_opts=opts.InitOpts(width="1366px", height="768px", theme=ThemeType.WESTEROS,
-                                          page_title="Top Countries Mentioned by Donald Trump"))
+                                          page_title=self._title("Top Countries Mentioned")))
         bar.add_xaxis(countries)
-        for year in self._loader.annual.keys():
-            annual = self._loader.annual[year]
+        years = self._loader.annual.keys() if self._period is None else [self._period]
+        for year in years:
+            annual = self._loader.annual[year] if self._period is None else total
             values = []
             for country in countries:
                 if country in annual.index:
@@ -54,7 +82,7 @@ class BarChart(Graph):
                     values.append(0)
             bar.add_yaxis(str(year), values, label_opts=opts.LabelOpts(font_weight="bold"), stack="total")
         bar.set_global_opts(
-            title_opts=opts.TitleOpts(title=f"Top {len(countries)} Countries Mentioned by Donald Trump"))
+            title_opts=opts.TitleOpts(title=self._title(f"Top {len(countries)} Countries Mentioned")))
         bar.set_series_opts(label_opts=opts.LabelOpts(is_show=False))
         bar.render(str(filepath))
 
@@ -63,7 +91,8 @@ class FlowMap(Graph):
     """
     Render a flow-map.
     """
-    def __init__(self, usa: str, countries: Container, loader: NormalLoader, top: int = 20) -> None:
+    def __init__(self, usa: str, countries: Container, loader: NormalLoader | RankingLoader, top: int = 20,
+                 speaker: str = "Donald Trump", period: str | None = None, all_coordinates: bool = False) -> None:
         """
         The constructor.
 
@@ -72,22 +101,29 @@ class FlowMap(Graph):
         countries: A country container.
         loader: A loader containing normal counts.
         top: The number of top countries to show.
+        speaker: The speaker shown in titles.
+        period: A period label. `None` means the total count is shown.
+        all_coordinates: Whether to register the coordinates of all countries instead of only the drawn ones.
         """
         assert top > 0
-        super().__init__()
+        super().__init__(speaker, period)
         self._usa: str = usa
         self._countries: Container = countries
-        self._loader: NormalLoader = loader
+        self._loader: NormalLoader | RankingLoader = loader
         self._top: int = top
+        self._all_coordinates: bool = all_coordinates
 
     def render(self, filepath: Path) -> None:
         super().render(filepath)
         geo = Geo(init_opts=opts.InitOpts(width="1366px", height="768px", theme=ThemeType.WESTEROS,
-                                          page_title="Top Countries Mentioned by Donald Trump")
+                                          page_title=self._title("Top Countries Mentioned"))
                   ).add_schema(maptype="world")
-        self._load_coordinates(geo)
-
-        total = self._loader.total.drop(index=[self._usa], errors="ignore").head(self._top)
+        total = self._total(self._loader).drop(index=[self._usa], errors="ignore").head(self._top)
+        self._load_coordinates(geo, self._countries.all() if self._all_coordinates
+                               else [self._usa] + total.index.tolist())
+        if total.empty:
+            geo.render(str(filepath))
+            return
         max_count = total.iloc[0, 0]
         max_width, max_point_size = 6, 60
         for row in total.itertuples():
@@ -100,24 +136,30 @@ class FlowMap(Graph):
 
         geo.set_series_opts(label_opts=opts.LabelOpts(is_show=False))
         geo.set_global_opts(title_opts=opts.TitleOpts(
-            title=f"Top {total.count()['count']} Countries Mentioned by Donald Trump"))
+            title=self._title(f"Top {total.count()['count']} Countries Mentioned")))
         geo.render(str(filepath))
 
-    def _load_coordinates(self, geo: Geo) -> None:
+    def _load_coordinates(self, geo: Geo, countries: list[str]) -> None:
         """
-        Load all countries' geographical locations.
+        Load countries' geographical locations.
+        A country not in the country list has no location, so it cannot be drawn.
         """
-        for country in self._countries.all():
-            loc = self._countries.location(country)
-            geo.add_coordinate(country, loc.longitude, loc.latitude)
+        ids = [self._countries.index(country) for country in countries]
+        unknown = [country for country, id in zip(countries, ids) if id < 0]
+        if len(unknown) > 0:
+            raise ValueError(f"No coordinates for countries: {', '.join(unknown)}")
+        latitudes, longitudes = self._countries.latitudes[ids].tolist(), self._countries.longitudes[ids].tolist()
+        for country, latitude, longitude in zip(countries, latitudes, longitudes):
+            geo.add_coordinate(country, longitude, latitude)
 
 
 class Sankey(Graph):
     """
     Render a Sankey diagram.
     """
-    def __init__(self, usa: str, normal: NormalLoader, diplomacy: DiplomacyLoader,
-                 first_lvl_top: int = 10, second_lvl_top: int = 3) -> None:
+    def __init__(self, usa: str, normal: NormalLoader | RankingLoader,
+                 diplomacy: DiplomacyLoader | LongDiplomacyLoader | RankingLoader,
+                 first_lvl_top: int = 10, second_lvl_top: int = 3, speaker: str = "Donald Trump") -> None:
         """
         The constructor.
 
@@ -127,12 +169,13 @@ class Sankey(Graph):
         diplomacy: A loader containing diplomacy counts.
         first_lvl_top: The number of top countries to show in the 1st level.
         second_lvl_top: The number of top diplomatic relations to show in the 2nd level.
+        speaker: The speaker shown in titles.
         """
         assert first_lvl_top > 0 and second_lvl_top > 0
-        super().__init__()
+        super().__init__(speaker)
         self._usa: str = usa
-        self._normal: NormalLoader = normal
-        self._diplomacy: DiplomacyLoader = diplomacy
+        self._normal: NormalLoader | RankingLoader = normal
+        self._diplomacy: DiplomacyLoader | LongDiplomacyLoader | RankingLoader = diplomacy
         self._first_lvl_top: int = first_lvl_top
         self._second_lvl_top: int = second_lvl_top
 
@@ -147,7 +190,7 @@ class Sankey(Graph):
             links.append({"source": self._usa,
                           "target": country, "value": row.count})
 
-            relations = self._diplomacy.total[country].head(self._second_lvl_top)
+            relations = self._diplomacy.top(country, self._second_lvl_top)
             for subrow in relations.itertuples():
                 relation = subrow.Index
                 node = f"{country} ↔ {relation}"
@@ -155,7 +198,7 @@ class Sankey(Graph):
                 links.append({"source": country, "target": node, "value": subrow.count})
 
         sankey = PySankey(init_opts=opts.InitOpts(width="1366px", height="768px", theme=ThemeType.MACARONS,
-                                                  page_title="Top Diplomatic Relations Mentioned by Donald Trump"))
+                                                  page_title=self._title("Top Diplomatic Relations Mentioned")))
         sankey.add("", nodes, links, node_gap=20,
                    linestyle_opt=opts.LineStyleOpts(opacity=0.2, curve=0.5, color="source"),
                    label_opts=opts.LabelOpts(position="right"), levels=[
@@ -165,5 +208,5 @@ class Sankey(Graph):
                     )])
         sankey.set_global_opts(title_opts=opts.TitleOpts(
             title_textstyle_opts=opts.TextStyleOpts(font_weight="bold"),
-            title="Top Diplomatic Relations Mentioned by Donald Trump"))
+            title=self._title("Top Diplomatic Relations Mentioned")))
         sankey.render(str(filepath))
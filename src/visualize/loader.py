@@ -1,9 +1,13 @@
 import json
 from pathlib import Path
 from collections import Counter
+from collections.abc import Iterable
 
+import numpy as np
 import pandas as pd
 
+from compact import Reader as CompactReader
+
 
 class PathTuple:
     """
@@ -27,6 +31,20 @@ class Loader:
         with paths.annual.open(encoding="utf-8") as file:
             self._handle_annual(json.load(file))
 
+    def load_compact(self, paths: PathTuple, countries: Iterable[str] | None = None,
+                     periods: Iterable[str] | None = None) -> None:
+        """
+        Load counts from JSON Lines files written in the compact mode.
+        Only the lines of the required countries and periods are parsed.
+
+        -- PARAMETERS --
+        paths: The paths of count files.
+        countries: The countries loaded from the total count. `None` means all countries.
+        periods: The periods loaded from the annual count. `None` means all periods.
+        """
+        self._handle_total(dict(CompactReader(paths.total).items(countries)))
+        self._handle_annual(dict(CompactReader(paths.annual).items(periods)))
+
     @property
     def total(self) -> pd.DataFrame | dict:
         """
@@ -77,6 +95,25 @@ class NormalLoader(Loader):
     def annual(self) -> dict[int, pd.DataFrame]:
         return self._annual
 
+    def period_total(self, period: str) -> pd.DataFrame:
+        """
+        Get the count of all countries in a period.
+        """
+        return self._annual[period] if period in self._annual else build_dataframe({})
+
+    def load_array(self, path: Path) -> None:
+        """
+        Load counts from a binary file saved by `ArrayNormalCounter`.
+        """
+        with np.load(path) as data:
+            counts, periods, countries = data["counts"], data["periods"].tolist(), data["countries"].tolist()
+
+        def to_count(row: np.ndarray) -> dict[str, int]:
+            return {countries[i]: int(row[i]) for i in np.flatnonzero(row)}
+
+        self._handle_total(to_count(counts.sum(axis=0)))
+        self._handle_annual({period: to_count(counts[i]) for i, period in enumerate(periods)})
+
     def _handle_total(self, count: Counter) -> None:
         self._total = build_dataframe(count)
 
@@ -99,6 +136,14 @@ class DiplomacyLoader(Loader):
     def annual(self) -> dict[int, dict[str, pd.DataFrame]]:
         return self._annual
 
+    def top(self, country: str, num: int) -> pd.DataFrame:
+        """
+        Get the top diplomatic relations of a country in the total count.
+        """
+        if country not in self._total:
+            return build_dataframe({})
+        return self._total[country].head(num)
+
     def _handle_total(self, count: dict[str, Counter]) -> None:
         for country in count.keys():
             self._total[country] = build_dataframe(count[country])
@@ -108,3 +153,135 @@ class DiplomacyLoader(Loader):
             self._annual[year] = {}
             for country in count[year].keys():
                 self._annual[year][country] = build_dataframe(count[year][country])
+
+
+class LongDiplomacyLoader(Loader):
+    """
+    Load diplomacy counts as a single long-format dataframe instead of a dataframe for each country and year.
+    Countries, relations and periods are categorical, and top relations are queried by grouping.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._total: pd.DataFrame = None
+        self._annual: pd.DataFrame = None
+
+    @property
+    def total(self) -> pd.DataFrame:
+        """
+        Get the total count, indexed by "country" and "relation".
+        """
+        return self._total
+
+    @property
+    def annual(self) -> pd.DataFrame:
+        """
+        Get the count for each period, indexed by "period", "country" and "relation".
+        """
+        return self._annual
+
+    def top(self, country: str, num: int, period: str | None = None) -> pd.DataFrame:
+        """
+        Get the top diplomatic relations of a country.
+
+        -- PARAMETERS --
+        country: A country.
+        num: The number of relations.
+        period: A period label. `None` means the total count.
+        """
+        data = self._total if period is None else self._annual.xs(period, level="period")
+        if country not in data.index.get_level_values("country"):
+            return build_dataframe({}).rename_axis("relation")
+        return data.xs(country, level="country").nlargest(num, "count")
+
+    def top_all(self, num: int, period: str | None = None) -> pd.DataFrame:
+        """
+        Get the top diplomatic relations of all countries at once.
+
+        -- PARAMETERS --
+        num: The number of relations of each country.
+        period: A period label. `None` means the total count.
+
+        -- RETURNS --
+        A dataframe indexed by "country" and "relation".
+        """
+        data = self._total if period is None else self._annual.xs(period, level="period")
+        res = data.groupby(level="country", observed=True)["count"].nlargest(num)
+        # `nlargest` adds the group level again.
+        return res.droplevel(0).to_frame()
+
+    def _handle_total(self, count: dict[str, Counter]) -> None:
+        rows = [(country, relation, num) for country, relations in count.items()
+                for relation, num in relations.items()]
+        self._total = _build_long_dataframe(rows, ["country", "relation"])
+
+    def _handle_annual(self, count: dict[str, dict[str, Counter]]) -> None:
+        rows = [(period, country, relation, num) for period, countries in count.items()
+                for country, relations in countries.items() for relation, num in relations.items()]
+        self._annual = _build_long_dataframe(rows, ["period", "country", "relation"])
+
+
+def _build_long_dataframe(rows: list[tuple], levels: list[str]) -> pd.DataFrame:
+    """
+    Create a long-format dataframe with a "count" column from rows, indexed by categorical levels.
+    """
+    data = pd.DataFrame(rows, columns=levels + ["count"])
+    for level in levels:
+        data[level] = data[level].astype("category")
+    data["count"] = data["count"].astype("int64")
+    return data.set_index(levels).sort_index()
+
+
+class RankingLoader:
+    """
+    Load the top countries and relations precomputed by `Ranking`.
+    It provides the same properties used by charts as `NormalLoader`, and the `top` method of diplomacy loaders,
+    but only for the ranked countries.
+    """
+    def __init__(self) -> None:
+        self._total: pd.DataFrame = None
+        self._annual: dict[str, pd.DataFrame] = {}
+        self._periods: dict[str, pd.DataFrame] = {}
+        self._relations: dict[str, pd.DataFrame] = {}
+
+    def load(self, path: Path) -> None:
+        """
+        Load a ranking from a JSON file.
+        """
+        with path.open(encoding="utf-8") as file:
+            ranking = json.load(file)
+        self._total = build_dataframe(dict(ranking["total"]))
+        countries = [country for country, _ in ranking["total"]]
+        for period, series in ranking["series"].items():
+            self._annual[period] = build_dataframe(dict(zip(countries, series)))
+        for period, total in ranking["periods"].items():
+            self._periods[period] = build_dataframe(dict(total))
+        for country, relations in ranking["relations"].items():
+            self._relations[country] = build_dataframe(dict(relations))
+
+    @property
+    def total(self) -> pd.DataFrame:
+        """
+        Get the total count of top countries.
+        """
+        return self._total
+
+    @property
+    def annual(self) -> dict[str, pd.DataFrame]:
+        """
+        Get the count of the total top countries in each period.
+        """
+        return self._annual
+
+    def period_total(self, period: str) -> pd.DataFrame:
+        """
+        Get the count of the top countries in a period.
+        """
+        return self._periods[period] if period in self._periods else build_dataframe({})
+
+    def top(self, country: str, num: int) -> pd.DataFrame:
+        """
+        Get the top diplomatic relations of a top country.
+        """
+        if country not in self._relations:
+            return build_dataframe({})
+        return self._relations[country].head(num)